@@ -0,0 +1,23 @@
+$(function() {
+  $("input[data-autocomplete-url]").each(function() {
+    var input = $(this);
+    var datalist = $("#" + input.attr("list"));
+    var timeout = null;
+    var request = null;
+
+    input.on("input", function() {
+      clearTimeout(timeout);
+      timeout = setTimeout(function() {
+        if (request) {
+          request.abort();
+        }
+        request = $.getJSON(input.data("autocomplete-url"), {q: input.val()}, function(data) {
+          datalist.empty();
+          $.each(data.results, function(i, result) {
+            datalist.append($("<option>").attr("value", result.name));
+          });
+        });
+      }, 100);
+    });
+  });
+});
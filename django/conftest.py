@@ -0,0 +1,15 @@
+import pytest
+
+from django.core.cache import cache
+
+
+@pytest.fixture(scope="function")
+def locmem_cache(settings):
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+    cache.clear()
+    yield
+    cache.clear()
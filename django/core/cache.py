@@ -1,66 +1,274 @@
 import time
 import hashlib
 
+from datetime import datetime
 from urllib.parse import quote
 
 from django.conf import settings
 from django.core.cache import cache
+from django.utils import timezone
+from django.views.decorators.http import condition
 
+from core.cache_stats import cache_stats
+from core.local_cache import LocalCache, InvalidationListener
 from core.utils import ChoiceEnum
 
 
 DEFAULT_CACHE_EXPIRY = 60 * 5
+STALE_CACHE_EXPIRY = 60 * 5
+
+CACHE_LOCK_TIMEOUT = 30
+CACHE_LOCK_WAIT = 2
+CACHE_LOCK_POLL_INTERVAL = 0.05
+
+# Safety net for invalidation broadcasts missed by a process, applies to
+# both condition generations and watermarks
+LOCAL_GENERATION_EXPIRY = 10
+
+local_cache = LocalCache(max_entries=settings.CACHE_LOCAL_MAX_ENTRIES)
+invalidation_listener = InvalidationListener(
+    local_cache=local_cache,
+    get_local_keys=lambda condition: (
+        get_generation_key(condition),
+        get_watermark_key(condition),
+    ),
+)
 
 
-# TODO: Support parameters in cache bust conditions (e.g. specific package update)
 class CacheBustCondition(ChoiceEnum):
     any_package_updated = "any_package_updated"
     dynamic_html_updated = "dynamic_html_updated"
 
+    # Scoped conditions, see scope_cache_bust_condition
+    package_updated = "package_updated"
+    owner_packages_updated = "owner_packages_updated"
+    package_dependants_updated = "package_dependants_updated"
+
+
+def scope_cache_bust_condition(cache_bust_condition, scope):
+    """
+    Narrow down a cache bust condition to a specific object, e.g. a single
+    package instead of any package.
+
+    :param cache_bust_condition: The condition which to scope
+    :type cache_bust_condition: str
+    :param scope: Identifier of the object the condition is scoped to
+    :return: The scoped cache bust condition
+    :rtype: str
+    """
+    return f"{cache_bust_condition}:{quote(str(scope))}"
+
+
+def validate_cache_bust_condition(cache_bust_condition):
+    condition = str(cache_bust_condition).split(":", 1)[0]
+    if condition not in CacheBustCondition.options():
+        raise ValueError(f"Invalid cache bust condition: {cache_bust_condition}")
+
+
+def cache_get_or_set(key, default, default_args=(), default_kwargs={}, expiry=None,
+                     family=None, fallback=None):
+    """
+    Return the cached value of a key, computing and storing it with the
+    default callable if missing.
+
+    Entries are kept for STALE_CACHE_EXPIRY seconds past their expiry. Only
+    the caller holding the recompute lock of a key runs the default
+    callable; everyone else gets the expired value while the refresh runs,
+    or waits for up to CACHE_LOCK_WAIT seconds if there is none. If still
+    nothing is available after waiting, the result of the optional fallback
+    callable is returned, unless it is None.
+
+    Fresh entries are additionally kept in the per-process local cache, if
+    enabled with the CACHE_LOCAL_MAX_ENTRIES setting.
+
+    Hits, misses, recompute times and payload sizes are recorded under the
+    given key family, see core.cache_stats.
+    """
+    lock_key = f"{key}.lock"
 
-def cache_get_or_set(key, default, default_args=(), default_kwargs={}, expiry=None):
     def call_default():
         if settings.DEBUG and settings.DEBUG_SIMULATED_LAG:
             time.sleep(settings.DEBUG_SIMULATED_LAG)
         return default(*default_args, **default_kwargs)
 
-    return cache.get_or_set(
-        key=key,
-        default=call_default,
-        timeout=expiry,
+    def store_locally(entry):
+        soft_expiry = entry[0]
+        if soft_expiry is None:
+            local_cache.set(key, entry)
+        else:
+            local_cache.set(key, entry, timeout=soft_expiry - time.time())
+
+    def recompute():
+        try:
+            start = time.time()
+            value = call_default()
+            cache_stats.record_miss(family, time.time() - start, value)
+            if expiry is None:
+                entry = (None, value)
+                cache.set(key, entry, timeout=None)
+            else:
+                entry = (time.time() + expiry, value)
+                cache.set(key, entry, timeout=expiry + STALE_CACHE_EXPIRY)
+            store_locally(entry)
+            return value
+        finally:
+            cache.delete(lock_key)
+
+    def acquire_lock():
+        return cache.add(lock_key, True, timeout=CACHE_LOCK_TIMEOUT)
+
+    # Local entries are only kept while fresh
+    entry = local_cache.get(key)
+    if entry is not None:
+        cache_stats.record_hit(family, is_local=True)
+        return entry[1]
+
+    entry = cache.get(key)
+    if entry is not None:
+        soft_expiry, value = entry
+        if soft_expiry is None or soft_expiry > time.time():
+            store_locally(entry)
+            cache_stats.record_hit(family)
+            return value
+        if acquire_lock():
+            return recompute()
+        cache_stats.record_stale_hit(family)
+        return value
+
+    if acquire_lock():
+        return recompute()
+
+    waited = 0
+    while waited < CACHE_LOCK_WAIT:
+        time.sleep(CACHE_LOCK_POLL_INTERVAL)
+        waited += CACHE_LOCK_POLL_INTERVAL
+        entry = cache.get(key)
+        if entry is not None:
+            cache_stats.record_hit(family)
+            return entry[1]
+
+    # The recomputing caller is taking too long, don't keep the request waiting
+    if fallback is not None:
+        value = fallback()
+        if value is not None:
+            cache_stats.record_stale_hit(family)
+            return value
+
+    start = time.time()
+    value = call_default()
+    cache_stats.record_miss(family, time.time() - start, value)
+    return value
+
+
+def get_generation_key(cache_bust_condition):
+    return f"cache.generation.{cache_bust_condition}"
+
+
+def get_initial_generation():
+    # Seeded from the clock so that a generation counter which has been
+    # evicted never restarts from a value already used for cache keys
+    return int(time.time() * 1000)
+
+
+def get_watermark_key(cache_bust_condition):
+    return f"cache.watermark.{cache_bust_condition}"
+
+
+def get_condition_state(key, initial):
+    # Generations and watermarks may only be kept locally while
+    # invalidations from other processes are being received
+    invalidation_listener.ensure_started()
+    is_listening = invalidation_listener.is_listening
+    if is_listening:
+        value = local_cache.get(key)
+        if value is not None:
+            return value
+
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, initial, timeout=None)
+        value = cache.get(key, initial)
+
+    if is_listening:
+        local_cache.set(key, value, timeout=LOCAL_GENERATION_EXPIRY)
+    return value
+
+
+def get_cache_generation(cache_bust_condition):
+    return get_condition_state(
+        get_generation_key(cache_bust_condition),
+        get_initial_generation(),
+    )
+
+
+def get_cache_watermark(cache_bust_condition):
+    """
+    Return the time at which the given cache bust condition was last
+    invalidated, or the time the watermark was first seen if that is not
+    known.
+
+    :return: Unix timestamp
+    :rtype: float
+    """
+    return get_condition_state(
+        get_watermark_key(cache_bust_condition),
+        time.time(),
     )
 
 
 def invalidate_cache(cache_bust_condition):
-    if hasattr(cache, "delete_pattern"):
-        cache.delete_pattern(f"cache.{cache_bust_condition}.*")
+    """
+    Invalidate every cache entry stored under the given cache bust condition.
+
+    Entries are not deleted; bumping the generation of the condition changes
+    the keys returned by get_cache_key, and the orphaned entries age out
+    through their expiry.
+    """
+    validate_cache_bust_condition(cache_bust_condition)
+    generation_key = get_generation_key(cache_bust_condition)
+    try:
+        cache.incr(generation_key)
+    except ValueError:
+        cache.add(generation_key, get_initial_generation(), timeout=None)
+    watermark_key = get_watermark_key(cache_bust_condition)
+    cache.set(watermark_key, time.time(), timeout=None)
+    local_cache.delete(generation_key)
+    local_cache.delete(watermark_key)
+    invalidation_listener.publish(cache_bust_condition)
+    cache_stats.record_invalidation(cache_bust_condition)
 
 
 def get_cache_key(cache_bust_condition, cache_type, key, vary_on):
-    if cache_bust_condition not in CacheBustCondition.options():
-        raise ValueError(f"Invalid cache bust condition: {cache_bust_condition}")
+    validate_cache_bust_condition(cache_bust_condition)
+    generation = get_cache_generation(cache_bust_condition)
     vary = "None"
     if vary_on:
         vary_args = ":".join(quote(str(var)) for var in vary_on)
         vary = hashlib.md5(vary_args.encode()).hexdigest()
-    return f"cache.{cache_bust_condition}.{cache_type}.{key}.{vary}"
+    return f"cache.{cache_bust_condition}.{generation}.{cache_type}.{key}.{vary}"
 
 
 class ManualCacheMixin(object):
     cache_until = None
     cache_expiry = DEFAULT_CACHE_EXPIRY
 
+    def get_cache_until(self, *args, **kwargs):
+        return self.cache_until
+
+    def should_cache(self, *args, **kwargs):
+        return self.request.method == "GET"
+
     def dispatch(self, *args, **kwargs):
 
         def get_default(*a, **kw):
             return super(ManualCacheMixin, self).dispatch(*a, **kw).render()
 
-        if self.request.method != "GET":
-            return get_default(*args, **kwargs)
+        if not self.should_cache(*args, **kwargs):
+            return super(ManualCacheMixin, self).dispatch(*args, **kwargs)
 
         return cache_get_or_set(
             key=get_cache_key(
-                cache_bust_condition=self.cache_until,
+                cache_bust_condition=self.get_cache_until(*args, **kwargs),
                 cache_type="view",
                 key=type(self).__name__,
                 vary_on=args + tuple(kwargs.values()),
@@ -69,9 +277,82 @@ class ManualCacheMixin(object):
             default_args=args,
             default_kwargs=kwargs,
             expiry=self.cache_expiry,
+            family=f"view.{type(self).__name__}",
         )
 
 
+class WatermarkConditionalMixin(object):
+    """
+    Answer conditional GET requests with 304 Not Modified based on when the
+    watermark_conditions were last invalidated, before the view itself is
+    dispatched.
+    """
+    watermark_conditions = ()
+    watermark_expiry = DEFAULT_CACHE_EXPIRY
+    watermark_vary_on_user = False
+
+    @classmethod
+    def as_view(cls, *args, **initkwargs):
+        view = super(WatermarkConditionalMixin, cls).as_view(*args, **initkwargs)
+        return condition(
+            etag_func=cls.get_watermark_etag,
+            last_modified_func=cls.get_watermark_last_modified,
+        )(view)
+
+    @classmethod
+    def get_watermark(cls):
+        watermark = max(
+            get_cache_watermark(cache_bust_condition)
+            for cache_bust_condition in cls.watermark_conditions
+        )
+        # Data which is not covered by cache invalidation (e.g. download
+        # counts) may still change, so roll over with the cache expiry
+        period_start = time.time() // cls.watermark_expiry * cls.watermark_expiry
+        return max(watermark, period_start)
+
+    @classmethod
+    def get_watermark_object_version(cls, request, *args, **kwargs):
+        """
+        Identify the current version of the object served by a detail view,
+        e.g. by its modification date.
+
+        Views serving a single object override this, so that a request for
+        an object which no longer exists is never answered with 304.
+
+        :return: The object version, or None if the object doesn't exist
+        :rtype: str
+        """
+        return ""
+
+    @classmethod
+    def get_watermark_etag_parts(cls, request, *args, **kwargs):
+        parts = [repr(cls.get_watermark())]
+        if cls.watermark_vary_on_user:
+            parts.append(str(request.user.pk))
+        return parts
+
+    @classmethod
+    def get_cached_object_version(cls, request, *args, **kwargs):
+        # Both condition functions need it, only look it up once
+        if not hasattr(request, "watermark_object_version"):
+            request.watermark_object_version = cls.get_watermark_object_version(request, *args, **kwargs)
+        return request.watermark_object_version
+
+    @classmethod
+    def get_watermark_etag(cls, request, *args, **kwargs):
+        object_version = cls.get_cached_object_version(request, *args, **kwargs)
+        if object_version is None:
+            return None
+        parts = cls.get_watermark_etag_parts(request, *args, **kwargs) + [object_version]
+        return hashlib.md5(":".join(parts).encode()).hexdigest()
+
+    @classmethod
+    def get_watermark_last_modified(cls, request, *args, **kwargs):
+        if cls.get_cached_object_version(request, *args, **kwargs) is None:
+            return None
+        return datetime.fromtimestamp(cls.get_watermark(), tz=timezone.utc)
+
+
 def cache_function_result(cache_until, expiry=DEFAULT_CACHE_EXPIRY):
     def decorator(original_function):
         def wrapper(*args, **kwargs):
@@ -86,6 +367,7 @@ def cache_function_result(cache_until, expiry=DEFAULT_CACHE_EXPIRY):
                 default_args=args,
                 default_kwargs=kwargs,
                 expiry=expiry,
+                family=f"func.{original_function.__name__}",
             )
         return wrapper
     return decorator
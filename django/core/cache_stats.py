@@ -0,0 +1,159 @@
+import time
+import pickle
+import threading
+
+from collections import defaultdict
+
+from django.core.cache import cache
+
+from core.utils import ChoiceEnum
+
+
+STATS_FLUSH_INTERVAL = 10
+STATS_KEY_PREFIX = "cache.stats"
+STATS_FAMILIES_KEY = f"{STATS_KEY_PREFIX}.families"
+
+
+class CacheStatMetric(ChoiceEnum):
+    hits = "hits"
+    local_hits = "local_hits"
+    stale_hits = "stale_hits"
+    misses = "misses"
+    recompute_ms = "recompute_ms"
+    payload_bytes = "payload_bytes"
+    invalidations = "invalidations"
+
+
+def get_payload_size(value):
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    try:
+        return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+def get_stats_key(family, metric):
+    return f"{STATS_KEY_PREFIX}.{family}.{metric}"
+
+
+class CacheStats(object):
+    """
+    Collects cache metrics per key family (e.g. "template.mod-list") in the
+    current process, and periodically adds them to the totals kept in the
+    shared cache so that all workers report into the same numbers.
+    """
+
+    def __init__(self):
+        self.pending = defaultdict(lambda: defaultdict(int))
+        self.lock = threading.Lock()
+        self.last_flush = time.time()
+
+    def record(self, family, **metrics):
+        if not family:
+            return
+        with self.lock:
+            for metric, value in metrics.items():
+                self.pending[family][metric] += value
+        if time.time() - self.last_flush > STATS_FLUSH_INTERVAL:
+            self.flush()
+
+    def record_hit(self, family, is_local=False):
+        if is_local:
+            self.record(family, hits=1, local_hits=1)
+        else:
+            self.record(family, hits=1)
+
+    def record_stale_hit(self, family):
+        self.record(family, stale_hits=1)
+
+    def record_miss(self, family, duration, value):
+        self.record(
+            family,
+            misses=1,
+            recompute_ms=int(duration * 1000),
+            payload_bytes=get_payload_size(value),
+        )
+
+    def record_invalidation(self, cache_bust_condition):
+        condition = str(cache_bust_condition).split(":", 1)[0]
+        self.record(f"invalidation.{condition}", invalidations=1)
+
+    def flush(self):
+        with self.lock:
+            pending = self.pending
+            self.pending = defaultdict(lambda: defaultdict(int))
+            self.last_flush = time.time()
+
+        if not pending:
+            return
+
+        for family, metrics in pending.items():
+            for metric, value in metrics.items():
+                if value:
+                    incr_or_add(get_stats_key(family, metric), value)
+
+        families = cache.get(STATS_FAMILIES_KEY) or set()
+        if not families.issuperset(pending.keys()):
+            cache.set(STATS_FAMILIES_KEY, families | set(pending.keys()), timeout=None)
+
+
+def incr_or_add(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, timeout=None):
+            cache.incr(key, delta)
+
+
+def get_cache_stats():
+    """
+    Return the collected cache metrics of every key family, including the
+    derived hit ratio and averages.
+
+    :return: Metrics keyed by key family
+    :rtype: dict
+    """
+    families = sorted(cache.get(STATS_FAMILIES_KEY) or set())
+    metrics = CacheStatMetric.options()
+    keys = [
+        get_stats_key(family, metric)
+        for family in families
+        for metric in metrics
+    ]
+    values = cache.get_many(keys)
+
+    result = {}
+    for family in families:
+        stats = {
+            metric: values.get(get_stats_key(family, metric), 0)
+            for metric in metrics
+        }
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_ratio"] = (
+            (stats["hits"] + stats["stale_hits"]) / lookups
+            if lookups else None
+        )
+        stats["avg_recompute_ms"] = (
+            stats["recompute_ms"] / stats["misses"]
+            if stats["misses"] else None
+        )
+        stats["avg_payload_bytes"] = (
+            stats["payload_bytes"] / stats["misses"]
+            if stats["misses"] else None
+        )
+        result[family] = stats
+    return result
+
+
+def reset_cache_stats():
+    families = cache.get(STATS_FAMILIES_KEY) or set()
+    cache.delete_many([
+        get_stats_key(family, metric)
+        for family in families
+        for metric in CacheStatMetric.options()
+    ])
+    cache.delete(STATS_FAMILIES_KEY)
+
+
+cache_stats = CacheStats()
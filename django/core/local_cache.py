@@ -0,0 +1,130 @@
+import os
+import time
+import pickle
+import logging
+import threading
+
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+INVALIDATION_CHANNEL = "cache.invalidations"
+LISTENER_RETRY_INTERVAL = 1
+
+logger = logging.getLogger(__name__)
+
+
+class LocalCache(object):
+    """
+    Size-bounded, per-process LRU cache with per-entry expiry.
+
+    Values which are not immutable are stored pickled, so that a cached
+    object (e.g. a response) is never shared between concurrent requests.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    @property
+    def is_enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key):
+        if not self.is_enabled:
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, is_pickled, value = entry
+            if expires is not None and expires <= time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+        if is_pickled:
+            return pickle.loads(value)
+        return value
+
+    def set(self, key, value, timeout=None):
+        if not self.is_enabled:
+            return
+        is_pickled = not isinstance(value, (str, bytes, int))
+        if is_pickled:
+            value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        expires = None
+        if timeout is not None:
+            expires = time.time() + timeout
+        with self.lock:
+            self.entries[key] = (expires, is_pickled, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class InvalidationListener(object):
+    """
+    Receives cache invalidations broadcast by other processes over Redis
+    pub/sub and drops the matching local cache entries.
+    """
+
+    def __init__(self, local_cache, get_local_keys):
+        self.local_cache = local_cache
+        self.get_local_keys = get_local_keys
+        self.is_listening = False
+        self.pid = None
+
+    @property
+    def is_available(self):
+        return (
+            self.local_cache.is_enabled and
+            settings.CACHES["default"]["BACKEND"] == "django_redis.cache.RedisCache"
+        )
+
+    def ensure_started(self):
+        # Started lazily, as gunicorn forks its workers after import
+        if self.pid == os.getpid() or not self.is_available:
+            return
+        self.pid = os.getpid()
+        self.is_listening = False
+        thread = threading.Thread(target=self.listen, daemon=True)
+        thread.start()
+
+    def listen(self):
+        from django_redis import get_redis_connection
+
+        while True:
+            try:
+                pubsub = get_redis_connection("default").pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                self.is_listening = True
+                for message in pubsub.listen():
+                    for key in self.get_local_keys(message["data"].decode()):
+                        self.local_cache.delete(key)
+            except Exception:
+                logger.exception("Cache invalidation listener failed, retrying")
+            # Invalidations may have been missed while disconnected
+            self.is_listening = False
+            self.local_cache.clear()
+            time.sleep(LISTENER_RETRY_INTERVAL)
+
+    def publish(self, value):
+        if not self.is_available:
+            return
+        from django_redis import get_redis_connection
+        from redis.exceptions import RedisError
+
+        try:
+            get_redis_connection("default").publish(INVALIDATION_CHANNEL, value)
+        except RedisError:
+            pass
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from core.cache_stats import CacheStatMetric, get_cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Shows the collected cache metrics per key family"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset the collected metrics",
+        )
+
+    def handle(self, *args, **kwargs):
+        if kwargs["reset"]:
+            reset_cache_stats()
+            self.stdout.write("Cache metrics reset!")
+            return
+
+        stats = get_cache_stats()
+        if not stats:
+            self.stdout.write("No cache metrics have been collected yet")
+            return
+
+        columns = CacheStatMetric.options() + ["hit_ratio", "avg_recompute_ms", "avg_payload_bytes"]
+        self.stdout.write("\t".join(["family"] + columns))
+        for family, metrics in stats.items():
+            row = [family] + [format_value(metrics[column]) for column in columns]
+            self.stdout.write("\t".join(row))
+
+
+def format_value(value):
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
@@ -0,0 +1,239 @@
+import json
+import base64
+import binascii
+
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.db import connection, models
+
+from core.cache import cache_get_or_set, get_cache_key
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+KeysetColumn = namedtuple("KeysetColumn", ("sql", "operator", "param", "is_last", "is_group"))
+
+
+class KeysetPage(object):
+    """
+    A page of a keyset paginated queryset.
+
+    Unlike OFFSET pagination, the page is located by the ordering values of
+    the row next to it, so fetching a deep page costs the same as the first
+    one and no total count is required.
+    """
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def get_ordering_field_name(ordering_field):
+    return ordering_field.lstrip("-")
+
+
+def get_ordering_model_field(model, ordering_field):
+    field_name = get_ordering_field_name(ordering_field)
+    if field_name == "pk":
+        return model._meta.pk
+    return model._meta.get_field(field_name)
+
+
+def encode_keyset_cursor(model, ordering, is_next, instance):
+    values = [
+        get_ordering_model_field(model, ordering_field).value_to_string(instance)
+        for ordering_field in ordering
+    ]
+    data = json.dumps(["n" if is_next else "p"] + values)
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_keyset_cursor(model, ordering, cursor):
+    """
+    Parse a cursor created by encode_keyset_cursor.
+
+    :param model: The model of the paginated queryset
+    :param ordering: The ordering of the paginated queryset
+    :param cursor: The cursor to parse
+    :return: Whether the cursor points forward, and the ordering values
+    :rtype: tuple
+    :raises InvalidCursor: If the cursor does not match the ordering
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        if not isinstance(data, list) or not data:
+            raise InvalidCursor()
+        direction, values = data[0], data[1:]
+        if direction not in ("n", "p") or len(values) != len(ordering):
+            raise InvalidCursor()
+        return direction == "n", [
+            get_ordering_model_field(model, ordering_field).to_python(value)
+            for ordering_field, value in zip(ordering, values)
+        ]
+    except (ValueError, TypeError, IndexError, binascii.Error, ValidationError) as e:
+        raise InvalidCursor() from e
+
+
+def get_keyset_columns(model, ordering, values, is_next):
+    quote_name = connection.ops.quote_name
+    table = quote_name(model._meta.db_table)
+    columns = []
+    for ordering_field, value in zip(ordering, values):
+        field = get_ordering_model_field(model, ordering_field)
+        operator = "<" if ordering_field.startswith("-") == is_next else ">"
+        columns.append(KeysetColumn(
+            sql=f"{table}.{quote_name(field.column)}",
+            operator=operator,
+            param=field.get_db_prep_value(value, connection),
+            # No rows lie beyond a boolean which is at its last value
+            is_last=isinstance(field, models.BooleanField) and bool(value) == (operator == ">"),
+            is_group=isinstance(field, models.BooleanField),
+        ))
+    return columns
+
+
+def get_expanded_condition(columns):
+    conditions = []
+    params = []
+    for i, column in enumerate(columns):
+        if column.is_last:
+            continue
+        conditions.append(" AND ".join([f"{c.sql} = %s" for c in columns[:i]] + [f"{column.sql} {column.operator} %s"]))
+        params += [c.param for c in columns[:i + 1]]
+    return "(" + " OR ".join(f"({condition})" for condition in conditions) + ")", params
+
+
+def get_keyset_condition(model, ordering, values, is_next):
+    """
+    Build the SQL condition matching rows after (or before) the given
+    ordering values, for orderings mixing ascending and descending fields.
+
+    The leading boolean fields split the rows into a few groups, which are
+    also bounded by redundant conditions so that an index on the ordering
+    can seek to the group of the cursor. Within that group the remaining
+    fields are compared as a row, which can seek the index as well.
+
+    :param model: The model of the paginated queryset
+    :param ordering: The ordering of the paginated queryset
+    :param values: The ordering values of the row next to the page
+    :param is_next: Whether to match the rows after or before the values
+    :return: The SQL condition and its parameters
+    :rtype: tuple
+    """
+    columns = get_keyset_columns(model, ordering, values, is_next)
+    group_size = 0
+    while group_size < len(columns) - 1 and columns[group_size].is_group:
+        group_size += 1
+    group, rest = columns[:group_size], columns[group_size:]
+
+    bounds = []
+    params = []
+    for column in group:
+        bounds.append(f"{column.sql} {column.operator}= %s")
+        params.append(column.param)
+        # Rows after the cursor only share the value of the next field if
+        # this one can't change anymore
+        if not column.is_last:
+            break
+
+    conditions, group_params = get_expanded_condition(group)
+    conditions = [conditions] if group_params else []
+    params += group_params
+    if len({column.operator for column in rest}) == 1:
+        rest_condition = "({}) {} ({})".format(
+            ", ".join(column.sql for column in rest),
+            rest[0].operator,
+            ", ".join(["%s"] * len(rest)),
+        )
+        rest_params = [column.param for column in rest]
+    else:
+        rest_condition, rest_params = get_expanded_condition(rest)
+    conditions.append(" AND ".join([f"{column.sql} = %s" for column in group] + [rest_condition]))
+    params += [column.param for column in group] + rest_params
+
+    condition = " AND ".join(bounds + ["(" + " OR ".join(f"({c})" for c in conditions) + ")"])
+    return condition, params
+
+
+def filter_keyset(queryset, ordering, values, is_next):
+    """
+    Filter the queryset to the rows after (or before) the given ordering
+    values, see get_keyset_condition.
+    """
+    condition, params = get_keyset_condition(queryset.model, ordering, values, is_next)
+    return queryset.extra(where=[condition], params=params)
+
+
+def reverse_ordering(ordering):
+    return [
+        get_ordering_field_name(ordering_field) if ordering_field.startswith("-") else f"-{ordering_field}"
+        for ordering_field in ordering
+    ]
+
+
+def paginate_keyset(queryset, ordering, cursor, page_size):
+    """
+    Fetch a page of the queryset by keyset pagination.
+
+    :param queryset: The queryset to paginate
+    :param ordering: The ordering to paginate by, which must end with a
+        unique field such as "pk"
+    :param cursor: A cursor of a previous page, or None for the first page
+    :param page_size: The amount of objects per page
+    :return: The page
+    :rtype: KeysetPage
+    :raises InvalidCursor: If the cursor does not match the ordering
+    """
+    model = queryset.model
+    is_next = True
+    if cursor:
+        is_next, values = decode_keyset_cursor(model, ordering, cursor)
+        queryset = filter_keyset(queryset, ordering, values, is_next)
+
+    if is_next:
+        queryset = queryset.order_by(*ordering)
+    else:
+        queryset = queryset.order_by(*reverse_ordering(ordering))
+    object_list = list(queryset[:page_size + 1])
+    has_more = len(object_list) > page_size
+    object_list = object_list[:page_size]
+    if not is_next:
+        object_list.reverse()
+
+    next_cursor = None
+    previous_cursor = None
+    if object_list:
+        if has_more or not is_next:
+            next_cursor = encode_keyset_cursor(model, ordering, True, object_list[-1])
+        if (has_more or is_next) and cursor:
+            previous_cursor = encode_keyset_cursor(model, ordering, False, object_list[0])
+    return KeysetPage(object_list, next_cursor, previous_cursor)
+
+
+def get_cached_count(queryset, cache_bust_condition, key, vary_on):
+    """
+    Count the queryset, caching the result until the condition is busted.
+    """
+    return cache_get_or_set(
+        key=get_cache_key(
+            cache_bust_condition=cache_bust_condition,
+            cache_type="count",
+            key=key,
+            vary_on=vary_on,
+        ),
+        default=queryset.count,
+        family=f"count.{key}",
+    )
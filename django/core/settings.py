@@ -37,6 +37,8 @@ env = environ.Env(
     B2_FILE_OVERWRITE=(bool, True),
 
     REDIS_URL=(str, ''),
+    CACHE_LOCAL_MAX_ENTRIES=(int, 0),
+    DOWNLOAD_COUNTER_BUFFERED=(bool, False),
 
     DB_CLIENT_CERT=(str, ''),
     DB_CLIENT_KEY=(str, ''),
@@ -190,6 +192,8 @@ AUTH_PASSWORD_VALIDATORS = [
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "var/media/")
 
+SNAPSHOT_ROOT = os.path.join(BASE_DIR, "var/snapshots/")
+
 STATIC_URL = "/static/"
 STATIC_ROOT = os.path.join(BASE_DIR, "var/static/")
 STATICFILES_DIRS = [
@@ -242,12 +246,21 @@ if REDIS_URL:
         }
     }
 
+# Size of the per-process cache kept in front of the shared cache, 0 disables
+CACHE_LOCAL_MAX_ENTRIES = env.int("CACHE_LOCAL_MAX_ENTRIES")
+
+# Count downloads in Redis and add them to the database periodically with
+# the flush_download_counters command
+DOWNLOAD_COUNTER_BUFFERED = env.bool("DOWNLOAD_COUNTER_BUFFERED") and bool(REDIS_URL)
+
 if DEBUG and not DEBUG_SIMULATED_LAG:
     CACHES = {
         'default': {
             'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
         }
     }
+    CACHE_LOCAL_MAX_ENTRIES = 0
+    DOWNLOAD_COUNTER_BUFFERED = False
 
 # REST Framework
 
@@ -268,6 +281,17 @@ DEFAULT_FILE_STORAGE = "django.core.files.storage.FileSystemStorage"
 THUMBNAIL_DEFAULT_STORAGE = "django.core.files.storage.FileSystemStorage"
 PACKAGE_FILE_STORAGE = "django.core.files.storage.FileSystemStorage"
 
+# Icon thumbnails, generated on upload and by the pregenerate_thumbnails
+# command. Templates only link to thumbnails of these aliases.
+THUMBNAIL_ALIASES = {
+    "": {
+        "icon_64": {"size": (64, 64)},
+        "icon_128": {"size": (128, 128)},
+        "icon_256": {"size": (256, 256)},
+        "icon_256_crop": {"size": (256, 256), "crop": True},
+    },
+}
+
 # Google Cloud Storage
 
 GS_BUCKET_NAME = env.str("GS_BUCKET_NAME")
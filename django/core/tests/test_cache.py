@@ -0,0 +1,141 @@
+import time
+
+import pytest
+
+from django.core.cache import cache
+from django.urls import reverse
+
+from core import cache as core_cache
+from core.cache import (
+    CacheBustCondition,
+    cache_get_or_set,
+    get_cache_key,
+    invalidate_cache,
+    scope_cache_bust_condition,
+)
+from core.cache_stats import CacheStats, get_cache_stats
+from core.local_cache import LocalCache
+
+
+def test_get_cache_key_scoped_condition():
+    condition = scope_cache_bust_condition(CacheBustCondition.package_updated, 12)
+    key = get_cache_key(condition, "template", "mod-detail", [12])
+    assert key.startswith("cache.package_updated:12.")
+    assert ".template.mod-detail." in key
+
+
+def test_get_cache_key_scopes_are_distinct():
+    key_a = get_cache_key(
+        scope_cache_bust_condition(CacheBustCondition.package_updated, 1),
+        "template", "mod-detail", [],
+    )
+    key_b = get_cache_key(
+        scope_cache_bust_condition(CacheBustCondition.package_updated, 11),
+        "template", "mod-detail", [],
+    )
+    assert key_a != key_b
+
+
+@pytest.mark.parametrize("condition", [
+    "invalid_condition",
+    "invalid_condition:1",
+])
+def test_get_cache_key_invalid_condition(condition):
+    with pytest.raises(ValueError):
+        get_cache_key(condition, "template", "mod-detail", [])
+
+
+def test_invalidate_cache_changes_key(locmem_cache):
+    condition = CacheBustCondition.any_package_updated
+    key = get_cache_key(condition, "view", "PackageViewSet", [])
+    assert key == get_cache_key(condition, "view", "PackageViewSet", [])
+    invalidate_cache(condition)
+    assert key != get_cache_key(condition, "view", "PackageViewSet", [])
+
+
+def test_invalidate_cache_scoped(locmem_cache):
+    scoped_a = scope_cache_bust_condition(CacheBustCondition.package_updated, 1)
+    scoped_b = scope_cache_bust_condition(CacheBustCondition.package_updated, 2)
+    key_a = get_cache_key(scoped_a, "template", "mod-detail", [])
+    key_b = get_cache_key(scoped_b, "template", "mod-detail", [])
+    invalidate_cache(scoped_a)
+    assert key_a != get_cache_key(scoped_a, "template", "mod-detail", [])
+    assert key_b == get_cache_key(scoped_b, "template", "mod-detail", [])
+
+
+def test_cache_get_or_set_fresh(locmem_cache):
+    assert cache_get_or_set("test.key", lambda: "first", expiry=60) == "first"
+    assert cache_get_or_set("test.key", lambda: "second", expiry=60) == "first"
+
+
+def test_cache_get_or_set_soft_expired_refreshes(locmem_cache):
+    cache.set("test.key", (time.time() - 1, "stale"))
+    assert cache_get_or_set("test.key", lambda: "fresh", expiry=60) == "fresh"
+    assert cache_get_or_set("test.key", lambda: "newer", expiry=60) == "fresh"
+
+
+def test_cache_get_or_set_soft_expired_while_locked(locmem_cache):
+    cache.set("test.key", (time.time() - 1, "stale"))
+    cache.set("test.key.lock", True)
+    assert cache_get_or_set("test.key", lambda: "fresh", expiry=60) == "stale"
+
+
+def test_cache_get_or_set_missing_while_locked(locmem_cache, monkeypatch):
+    monkeypatch.setattr(core_cache, "CACHE_LOCK_WAIT", 0.1)
+    cache.set("test.key.lock", True)
+    assert cache_get_or_set("test.key", lambda: "fresh", expiry=60) == "fresh"
+    # Only the lock holder stores the recomputed value
+    assert cache.get("test.key") is None
+
+
+def test_local_cache_evicts_least_recently_used():
+    local = LocalCache(max_entries=2)
+    local.set("a", "1")
+    local.set("b", "2")
+    assert local.get("a") == "1"
+    local.set("c", "3")
+    assert local.get("a") == "1"
+    assert local.get("b") is None
+    assert local.get("c") == "3"
+
+
+def test_local_cache_expiry():
+    local = LocalCache(max_entries=2)
+    local.set("a", "1", timeout=-1)
+    assert local.get("a") is None
+
+
+def test_local_cache_copies_mutable_values():
+    local = LocalCache(max_entries=2)
+    local.set("a", {"value": 1})
+    local.get("a")["value"] = 2
+    assert local.get("a") == {"value": 1}
+
+
+def test_cache_get_or_set_local_tier(locmem_cache, monkeypatch):
+    monkeypatch.setattr(core_cache, "local_cache", LocalCache(max_entries=10))
+    assert cache_get_or_set("test.key", lambda: "first", expiry=60) == "first"
+    cache.clear()
+    assert cache_get_or_set("test.key", lambda: "second", expiry=60) == "first"
+
+
+def test_cache_stats(locmem_cache, monkeypatch):
+    stats = CacheStats()
+    monkeypatch.setattr(core_cache, "cache_stats", stats)
+    cache_get_or_set("test.key", lambda: "value", expiry=60, family="template.test")
+    cache_get_or_set("test.key", lambda: "value", expiry=60, family="template.test")
+    invalidate_cache(CacheBustCondition.any_package_updated)
+    stats.flush()
+
+    result = get_cache_stats()
+    assert result["template.test"]["hits"] == 1
+    assert result["template.test"]["misses"] == 1
+    assert result["template.test"]["payload_bytes"] == len("value")
+    assert result["template.test"]["hit_ratio"] == 0.5
+    assert result["invalidation.any_package_updated"]["invalidations"] == 1
+
+
+@pytest.mark.django_db
+def test_cache_stats_view_requires_staff(client):
+    response = client.get(reverse("cache_stats"))
+    assert response.status_code == 302
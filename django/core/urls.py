@@ -10,6 +10,7 @@ from rest_framework import routers
 
 from rest_framework_swagger.views import get_swagger_view
 
+from core.views import cache_stats
 from repository.urls import urlpatterns as repository_urls
 from repository.views import PackageListView
 from repository.api.v1.viewsets import PackageViewSet
@@ -32,6 +33,7 @@ urlpatterns = [
     path('favicon.ico', RedirectView.as_view(url="%s%s" % (settings.STATIC_URL, 'favicon.ico'))),
     path('djangoadmin/', admin.site.urls),
     path('healthcheck/', lambda request: HttpResponse("OK"), name="healthcheck"),
+    path('cache-stats/', cache_stats, name="cache_stats"),
     path('api/v1/', include((api_v1_router.urls, "api-v1"), namespace="api-v1")),
 ]
 
@@ -0,0 +1,9 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+
+from core.cache_stats import get_cache_stats
+
+
+@staff_member_required
+def cache_stats(request):
+    return JsonResponse(get_cache_stats())
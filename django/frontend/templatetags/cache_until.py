@@ -4,6 +4,7 @@ from django.template import (
 
 from core.cache import (
     DEFAULT_CACHE_EXPIRY, get_cache_key, cache_get_or_set,
+    scope_cache_bust_condition,
 )
 
 
@@ -47,6 +48,7 @@ class CacheNode(Node):
             ),
             default=lambda: self.nodelist.render(context),
             expiry=expire_time,
+            family=f"template.{self.fragment_name}",
         )
 
 
@@ -66,6 +68,12 @@ def do_cache(parser, token):
             .. some expensive processing ..
         {% endcache %}
     Each unique set of arguments will result in a unique cache entry.
+    The cache bust condition can be scoped to a single object with the
+    cache_scope filter::
+        {% load cache_until %}
+        {% cache_until "package_updated"|cache_scope:object.pk [fragment_name] [timeout] %}
+            .. some expensive processing ..
+        {% endcache %}
     """
     nodelist = parser.parse(("endcache",))
     parser.delete_first_token()
@@ -85,3 +93,8 @@ def do_cache(parser, token):
         expiry=expiry,
         vary_on=[parser.compile_filter(t) for t in tokens[4:]],
     )
+
+
+@register.filter("cache_scope")
+def cache_scope(cache_bust_condition, scope):
+    return scope_cache_bust_condition(cache_bust_condition, scope)
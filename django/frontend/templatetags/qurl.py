@@ -7,6 +7,10 @@ from django.template import (
 
 register = Library()
 
+# Positions within a list are only meaningful for the same query, so these
+# are dropped whenever any other parameter changes
+PAGINATION_PARAMS = ("page", "cursor")
+
 
 class QurlNode(Node):
 
@@ -17,6 +21,9 @@ class QurlNode(Node):
     def render(self, context):
         request = context["request"]
         params = request.GET.dict()
+        if self.param_key not in PAGINATION_PARAMS:
+            for key in PAGINATION_PARAMS:
+                params.pop(key, None)
         params[self.param_key] = self.param_val.resolve(context)
         return f"{request.path}?{urlencode(params)}"
 
@@ -3,6 +3,7 @@ from django.contrib import admin
 
 from repository.models import Package
 from repository.models import PackageVersion
+from repository.models import PackageVersionDailyDownloads
 from repository.models import UploaderIdentity
 from repository.models import UploaderIdentityMember
 
@@ -47,7 +48,6 @@ class PackageVersionInline(admin.StackedInline):
         "file",
         "icon",
         "name",
-        "readme",
         "version_number",
         "website_url",
     )
@@ -83,3 +83,25 @@ class PackageAdmin(admin.ModelAdmin):
         "name",
         "owner__name",
     )
+
+
+@admin.register(PackageVersionDailyDownloads)
+class PackageVersionDailyDownloadsAdmin(admin.ModelAdmin):
+    readonly_fields = (
+        "version",
+        "date",
+        "downloads",
+    )
+    list_display = (
+        "version",
+        "date",
+        "downloads",
+    )
+    list_select_related = (
+        "version__package__owner",
+    )
+    date_hierarchy = "date"
+    search_fields = (
+        "version__package__name",
+        "version__package__owner__name",
+    )
@@ -0,0 +1,138 @@
+import base64
+import binascii
+
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from repository.models import PACKAGE_TOMBSTONE_RETENTION, Package, PackageTombstone
+
+
+# Rows are stamped before their transaction commits, so a change may become
+# visible slightly after a cursor past its timestamp was handed out. Changes
+# within this window are therefore repeated on the next sync.
+CHANGES_OVERLAP = timedelta(minutes=1)
+CHANGES_PAGE_SIZE = 500
+
+# The point a sync started from, and for the following pages of a sync the
+# (date_modified, pk) of the last package already returned
+ChangesCursor = namedtuple("ChangesCursor", ("since", "after"))
+
+
+class ChangesExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = (
+        "Deletions this old are no longer tracked, "
+        "fetch the full package list and sync from then on instead"
+    )
+    default_code = "changes_expired"
+
+
+def to_microseconds(timestamp):
+    return int(timestamp.timestamp() * 1000000)
+
+
+def from_microseconds(microseconds):
+    return datetime.fromtimestamp(int(microseconds) / 1000000, tz=timezone.utc)
+
+
+def encode_cursor(since, after=None):
+    parts = [str(to_microseconds(since))]
+    if after is not None:
+        date_modified, pk = after
+        parts += [str(to_microseconds(date_modified)), str(pk)]
+    return base64.urlsafe_b64encode(":".join(parts).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Parse the value of a change feed `since` parameter.
+
+    :param cursor: Either a cursor returned by the feed or an ISO 8601 timestamp
+    :return: The parsed cursor
+    :rtype: ChangesCursor
+    """
+    if not cursor:
+        raise ValidationError({"since": "This parameter is required"})
+
+    try:
+        parts = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        if len(parts) == 1:
+            return ChangesCursor(from_microseconds(parts[0]), None)
+        if len(parts) == 3:
+            return ChangesCursor(from_microseconds(parts[0]), (from_microseconds(parts[1]), int(parts[2])))
+    except (ValueError, binascii.Error, UnicodeError, OverflowError, OSError):
+        pass
+
+    timestamp = None
+    try:
+        timestamp = parse_datetime(cursor)
+    except ValueError:
+        pass
+    if timestamp is None:
+        raise ValidationError({"since": "Invalid cursor or timestamp"})
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp, timezone.utc)
+    return ChangesCursor(timestamp, None)
+
+
+def get_package_changes(cursor, page_size=CHANGES_PAGE_SIZE):
+    """
+    Collect a page of the packages changed since the given cursor.
+
+    Packages which are no longer listed, either because they were
+    deactivated or deleted, are returned as removed by their uuid4. While
+    more pages follow, the returned cursor continues the same sync.
+
+    :param cursor: The cursor returned by decode_cursor
+    :param page_size: The maximum amount of changed packages per page
+    :return: The next cursor, whether more pages follow, the changed
+        packages and the removed uuid4s
+    :rtype: tuple
+    :raises ChangesExpired: If deletions since the cursor may have been
+        forgotten already
+    """
+    since, after = cursor
+    if since < timezone.now() - PACKAGE_TOMBSTONE_RETENTION:
+        raise ChangesExpired()
+    if after is None:
+        # A new sync, which is continued from the time it started
+        since = timezone.now()
+        threshold = cursor.since - CHANGES_OVERLAP
+        changed = Package.objects.filter(date_modified__gte=threshold)
+    else:
+        date_modified, pk = after
+        changed = Package.objects.filter(date_modified__gte=date_modified).exclude(
+            date_modified=date_modified, pk__lte=pk,
+        )
+    changed = list(changed.order_by("date_modified", "pk").values_list("pk", "uuid4", "date_modified")[:page_size + 1])
+    has_more = len(changed) > page_size
+    changed = changed[:page_size]
+
+    packages = list(
+        Package.objects
+        .active()
+        .filter(pk__in=[pk for pk, uuid4, date_modified in changed])
+        .prefetch_available_versions()
+        .order_by("date_modified", "pk")
+    )
+    listed = set(package.pk for package in packages)
+    removed = [uuid4 for pk, uuid4, date_modified in changed if pk not in listed]
+    if after is None:
+        removed.extend(
+            PackageTombstone.objects
+            .filter(date_deleted__gte=threshold)
+            .values_list("uuid4", flat=True)
+        )
+
+    if has_more:
+        last_pk, last_uuid4, last_date_modified = changed[-1]
+        next_cursor = encode_cursor(since, (last_date_modified, last_pk))
+    else:
+        next_cursor = encode_cursor(since)
+    return next_cursor, has_more, packages, removed
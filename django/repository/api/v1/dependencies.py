@@ -0,0 +1,72 @@
+from django.urls import reverse
+
+from rest_framework.exceptions import ValidationError
+
+from repository.dependency_graph import DependencyDepthError, dependency_graph
+
+
+MAX_RESOLVED_PACKAGES = 100
+
+
+def parse_full_version_names(value):
+    """
+    Parse the value of a dependency resolution `packages` parameter.
+
+    :param value: Comma separated identifiers in the Owner-Name-Version format
+    :return: The identifiers
+    :rtype: list
+    """
+    full_version_names = [name.strip() for name in (value or "").split(",") if name.strip()]
+    if not full_version_names:
+        raise ValidationError({"packages": "This parameter is required"})
+    if len(full_version_names) > MAX_RESOLVED_PACKAGES:
+        raise ValidationError({"packages": f"At most {MAX_RESOLVED_PACKAGES} packages can be resolved at once"})
+    return full_version_names
+
+
+def resolve_dependencies(request, full_version_names):
+    """
+    Resolve the given package versions and all of their dependencies.
+
+    :param request: The request used to build absolute download URLs
+    :param full_version_names: Identifiers in the Owner-Name-Version format
+    :return: The resolved versions ordered so that dependencies come before
+        their dependants, the identifiers which were not found and the
+        dependency cycles found
+    :rtype: dict
+    """
+    dependency_graph.refresh()
+    with dependency_graph.lock:
+        try:
+            version_pks, missing, cycles = dependency_graph.resolve(full_version_names)
+        except DependencyDepthError as e:
+            raise ValidationError({"packages": str(e)})
+        resolved = [
+            (
+                dependency_graph.versions[version_pk],
+                [
+                    dependency_graph.get_full_version_name(dependency_pk)
+                    for dependency_pk in dependency_graph.dependencies[version_pk]
+                    if dependency_pk in dependency_graph.versions
+                ],
+            )
+            for version_pk in version_pks
+        ]
+
+    versions = []
+    for (owner, name, version_number), dependencies in resolved:
+        download_url = reverse("packages.download", kwargs={
+            "owner": owner,
+            "name": name,
+            "version": version_number,
+        })
+        versions.append({
+            "full_name": f"{owner}-{name}-{version_number}",
+            "download_url": request.build_absolute_uri(download_url),
+            "dependencies": dependencies,
+        })
+    return {
+        "versions": versions,
+        "missing": missing,
+        "cycles": cycles,
+    }
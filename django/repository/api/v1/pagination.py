@@ -0,0 +1,69 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import replace_query_param
+
+from core.cache import CacheBustCondition
+from core.pagination import InvalidCursor, get_cached_count, paginate_keyset
+
+from repository.cache import MOD_LIST_ORDERING
+from repository.models import Package
+
+
+PACKAGE_PAGE_SIZE = 100
+MAX_PACKAGE_PAGE_SIZE = 500
+
+
+def is_paginated_request(request):
+    return "cursor" in request.query_params or "page_size" in request.query_params
+
+
+def get_page_size(request):
+    page_size = request.query_params.get("page_size")
+    if page_size is None:
+        return PACKAGE_PAGE_SIZE
+    try:
+        page_size = int(page_size)
+    except ValueError:
+        raise ValidationError({"page_size": "A number is required"})
+    if not 1 <= page_size <= MAX_PACKAGE_PAGE_SIZE:
+        raise ValidationError({"page_size": f"Must be between 1 and {MAX_PACKAGE_PAGE_SIZE}"})
+    return page_size
+
+
+def get_package_list_page(request):
+    """
+    Fetch a page of the v1 package list by keyset pagination, in the same
+    order as the full list.
+
+    :param request: The request with the optional cursor and page_size
+        query parameters
+    :return: The page, and the URLs of the next and previous pages
+    :rtype: tuple
+    :raises ValidationError: If a query parameter is invalid
+    """
+    try:
+        page = paginate_keyset(
+            queryset=Package.objects.active().prefetch_available_versions(),
+            ordering=MOD_LIST_ORDERING,
+            cursor=request.query_params.get("cursor"),
+            page_size=get_page_size(request),
+        )
+    except InvalidCursor:
+        raise ValidationError({"cursor": "Invalid cursor"})
+
+    url = request.build_absolute_uri()
+    next_url = None
+    previous_url = None
+    if page.has_next():
+        next_url = replace_query_param(url, "cursor", page.next_cursor)
+    if page.has_previous():
+        previous_url = replace_query_param(url, "cursor", page.previous_cursor)
+    return page, next_url, previous_url
+
+
+def get_package_count():
+    return get_cached_count(
+        queryset=Package.objects.active(),
+        cache_bust_condition=CacheBustCondition.any_package_updated,
+        key="package-list",
+        vary_on=[],
+    )
@@ -47,7 +47,7 @@ class PackageSerializer(ModelSerializer):
     package_url = SerializerMethodField()
 
     def get_versions(self, instance):
-        versions = instance.available_versions
+        versions = instance.get_available_versions_list()
         return PackageVersionSerializer(versions, many=True, context=self._context).data
 
     def get_owner(self, instance):
@@ -0,0 +1,259 @@
+import os
+import time
+import zlib
+import hashlib
+
+import brotli
+
+from django.conf import settings
+
+from rest_framework.renderers import JSONRenderer
+
+from core.cache import (
+    DEFAULT_CACHE_EXPIRY,
+    CacheBustCondition,
+    cache_get_or_set,
+    get_cache_generation,
+    get_cache_key,
+)
+from core.utils import ChoiceEnum
+
+from repository.api.v1.serializers import PackageSerializer
+from repository.cache import MOD_LIST_ORDERING
+from repository.models import Package
+
+
+SNAPSHOT_EXPIRY = DEFAULT_CACHE_EXPIRY
+SNAPSHOT_NAME = "package-list"
+PACKAGE_LIST_CHUNK_SIZE = 500
+GZIP_WBITS = zlib.MAX_WBITS | 16
+
+
+class SnapshotEncoding(ChoiceEnum):
+    brotli = "br"
+    gzip = "gzip"
+
+
+def get_accepted_encoding(request):
+    """
+    Pick the preferred snapshot encoding accepted by the client.
+
+    :param request: The request which to check
+    :return: A SnapshotEncoding, or None if neither is accepted
+    :rtype: str
+    """
+    accepted = set()
+    for part in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        coding, _, params = part.partition(";")
+        try:
+            if float(params.strip().replace(" ", "").replace("q=", "") or 1) == 0:
+                continue
+        except ValueError:
+            pass
+        accepted.add(coding.strip().lower())
+    for encoding in SnapshotEncoding.options():
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def get_snapshot_directory(base_url):
+    # Download URLs are absolute, so snapshots differ per requested host
+    host_hash = hashlib.md5(base_url.encode()).hexdigest()
+    return os.path.join(settings.SNAPSHOT_ROOT, SNAPSHOT_NAME, host_hash)
+
+
+def get_snapshot_path(directory, generation, encoding):
+    return os.path.join(directory, f"{generation}.json.{encoding}")
+
+
+def get_snapshot_generations(directory):
+    try:
+        filenames = os.listdir(directory)
+    except OSError:
+        return []
+    generations = set()
+    for filename in filenames:
+        generation = filename.split(".", 1)[0]
+        if generation.isdigit():
+            generations.add(int(generation))
+    return sorted(generations, reverse=True)
+
+
+def read_snapshot(directory, generation, max_age=None):
+    snapshot = {}
+    for encoding in SnapshotEncoding.options():
+        path = get_snapshot_path(directory, generation, encoding)
+        try:
+            if max_age is not None and os.path.getmtime(path) < time.time() - max_age:
+                return None
+            with open(path, "rb") as f:
+                snapshot[encoding] = f.read()
+        except OSError:
+            return None
+    return snapshot
+
+
+def write_snapshot(directory, generation, snapshot):
+    os.makedirs(directory, exist_ok=True)
+    for encoding, content in snapshot.items():
+        path = get_snapshot_path(directory, generation, encoding)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(content)
+        os.replace(temp_path, path)
+
+    # Keep the previous snapshot around as a fallback while a new one builds
+    for old_generation in get_snapshot_generations(directory)[2:]:
+        for encoding in SnapshotEncoding.options():
+            try:
+                os.remove(get_snapshot_path(directory, old_generation, encoding))
+            except OSError:
+                pass
+
+
+def iter_package_list_chunks(chunk_size=PACKAGE_LIST_CHUNK_SIZE):
+    """
+    Iterate the packages of the v1 package list in chunks, so that only a
+    single chunk is held in memory at a time.
+
+    :param chunk_size: The amount of packages to load per query
+    :return: Lists of packages with their versions prefetched
+    :rtype: generator
+    """
+    # QuerySet.iterator() does not prefetch, so only the primary keys are
+    # streamed from the database and each chunk is fetched separately
+    pk_iterator = (
+        Package.objects
+        .active()
+        .order_by(*MOD_LIST_ORDERING)
+        .values_list("pk", flat=True)
+        .iterator(chunk_size=chunk_size)
+    )
+    chunk = []
+    for pk in pk_iterator:
+        chunk.append(pk)
+        if len(chunk) >= chunk_size:
+            yield get_package_chunk(chunk)
+            chunk = []
+    if chunk:
+        yield get_package_chunk(chunk)
+
+
+def get_package_chunk(pk_list):
+    packages = Package.objects.filter(pk__in=pk_list).prefetch_available_versions().in_bulk()
+    return [packages[pk] for pk in pk_list if pk in packages]
+
+
+def iter_package_list_json(request):
+    """
+    Render the package list as served by the v1 API incrementally.
+
+    :param request: The request used to build absolute download URLs
+    :return: The JSON encoded package list in parts
+    :rtype: generator
+    """
+    renderer = JSONRenderer()
+    separator = b"["
+    for packages in iter_package_list_chunks():
+        serializer = PackageSerializer(
+            packages,
+            many=True,
+            context={"request": request},
+        )
+        parts = []
+        for package in serializer.data:
+            parts.append(separator)
+            parts.append(renderer.render(package))
+            separator = b","
+        yield b"".join(parts)
+    if separator == b"[":
+        yield b"["
+    yield b"]"
+
+
+def iter_decompressed(content, chunk_size=64 * 1024):
+    """
+    Decompress a gzip snapshot in parts.
+
+    :param content: The gzip compressed snapshot
+    :param chunk_size: The amount of compressed bytes to process at a time
+    :return: The decompressed snapshot in parts
+    :rtype: generator
+    """
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    for start in range(0, len(content), chunk_size):
+        yield decompressor.decompress(content[start:start + chunk_size])
+    yield decompressor.flush()
+
+
+def build_package_list_snapshot(request):
+    """
+    Render the full package list as served by the v1 API, compressed with
+    every SnapshotEncoding.
+
+    The list is compressed as it is rendered, so the uncompressed list is
+    never held in memory as a whole.
+
+    :param request: The request used to build absolute download URLs
+    :return: The compressed snapshot keyed by encoding
+    :rtype: dict
+    """
+    brotli_compressor = brotli.Compressor(quality=9)
+    gzip_compressor = zlib.compressobj(9, zlib.DEFLATED, GZIP_WBITS)
+    brotli_parts = []
+    gzip_parts = []
+    for part in iter_package_list_json(request):
+        brotli_parts.append(brotli_compressor.process(part))
+        gzip_parts.append(gzip_compressor.compress(part))
+    brotli_parts.append(brotli_compressor.finish())
+    gzip_parts.append(gzip_compressor.flush())
+    return {
+        SnapshotEncoding.brotli: b"".join(brotli_parts),
+        SnapshotEncoding.gzip: b"".join(gzip_parts),
+    }
+
+
+def get_package_list_snapshot(request):
+    """
+    Return the compressed package list snapshot for the current state of
+    the catalog, building it if necessary.
+
+    Snapshots are kept both in the cache and on disk, so that a cache miss
+    on another worker of the same host does not rebuild the snapshot.
+    While a new snapshot is being built, the previous one is served.
+
+    :param request: The request which the snapshot is served to
+    :return: The compressed snapshot keyed by encoding
+    :rtype: dict
+    """
+    base_url = request.build_absolute_uri("/")
+    directory = get_snapshot_directory(base_url)
+    generation = get_cache_generation(CacheBustCondition.any_package_updated)
+
+    def load_or_build():
+        snapshot = read_snapshot(directory, generation, max_age=SNAPSHOT_EXPIRY)
+        if snapshot is None:
+            snapshot = build_package_list_snapshot(request)
+            write_snapshot(directory, generation, snapshot)
+        return snapshot
+
+    def get_previous():
+        for previous in get_snapshot_generations(directory):
+            snapshot = read_snapshot(directory, previous)
+            if snapshot is not None:
+                return snapshot
+        return None
+
+    return cache_get_or_set(
+        key=get_cache_key(
+            cache_bust_condition=CacheBustCondition.any_package_updated,
+            cache_type="snapshot",
+            key=SNAPSHOT_NAME,
+            vary_on=[base_url],
+        ),
+        default=load_or_build,
+        expiry=SNAPSHOT_EXPIRY,
+        family=f"snapshot.{SNAPSHOT_NAME}",
+        fallback=get_previous,
+    )
@@ -1,17 +1,104 @@
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
 
-from core.cache import ManualCacheMixin, CacheBustCondition
+from core.cache import (
+    CacheBustCondition,
+    ManualCacheMixin,
+    WatermarkConditionalMixin,
+)
 
+from repository.api.v1.changes import decode_cursor, get_package_changes
+from repository.api.v1.dependencies import parse_full_version_names, resolve_dependencies
+from repository.api.v1.pagination import (
+    get_package_count,
+    get_package_list_page,
+    is_paginated_request,
+)
 from repository.api.v1.serializers import (
     PackageSerializer,
 )
-from repository.cache import get_mod_list_queryset
+from repository.api.v1.snapshot import (
+    SnapshotEncoding,
+    get_accepted_encoding,
+    get_package_list_snapshot,
+    iter_decompressed,
+)
+from repository.cache import get_mod_list_queryset, get_package_version_tag
+from repository.models import Package
 
 
-class PackageViewSet(ManualCacheMixin, viewsets.ReadOnlyModelViewSet):
+class PackageViewSet(WatermarkConditionalMixin, ManualCacheMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = PackageSerializer
     lookup_field = "uuid4"
     cache_until = CacheBustCondition.any_package_updated
+    watermark_conditions = (CacheBustCondition.any_package_updated,)
 
     def get_queryset(self):
         return get_mod_list_queryset()
+
+    @classmethod
+    def get_watermark_object_version(cls, request, *args, **kwargs):
+        if cls.lookup_field not in kwargs:
+            return ""
+        return get_package_version_tag(Package.objects.active().filter(uuid4=kwargs[cls.lookup_field]))
+
+    @classmethod
+    def get_watermark_etag_parts(cls, request, *args, **kwargs):
+        parts = super().get_watermark_etag_parts(request, *args, **kwargs)
+        if cls.lookup_field not in kwargs:
+            # The list is served in several content codings, which need
+            # distinct strong validators
+            parts.append(get_accepted_encoding(request) or "identity")
+        return parts
+
+    def should_cache(self, *args, **kwargs):
+        # The list is served from a precompressed snapshot instead
+        return (
+            super().should_cache(*args, **kwargs) and
+            self.lookup_field in kwargs
+        )
+
+    def list(self, request, *args, **kwargs):
+        if is_paginated_request(request):
+            return self.list_page(request)
+        snapshot = get_package_list_snapshot(request)
+        encoding = get_accepted_encoding(request)
+        if encoding:
+            response = HttpResponse(snapshot[encoding], content_type="application/json")
+            response["Content-Encoding"] = encoding
+        else:
+            content = iter_decompressed(snapshot[SnapshotEncoding.gzip])
+            response = StreamingHttpResponse(content, content_type="application/json")
+        patch_vary_headers(response, ("Accept-Encoding",))
+        return response
+
+    def list_page(self, request):
+        page, next_url, previous_url = get_package_list_page(request)
+        serializer = self.get_serializer(page.object_list, many=True)
+        return Response({
+            "count": get_package_count(),
+            "next": next_url,
+            "previous": previous_url,
+            "results": serializer.data,
+        })
+
+    @action(detail=False, url_path="changes")
+    def changes(self, request, *args, **kwargs):
+        since = decode_cursor(request.query_params.get("since"))
+        cursor, has_more, packages, removed = get_package_changes(since)
+        serializer = self.get_serializer(packages, many=True)
+        return Response({
+            "cursor": cursor,
+            "has_more": has_more,
+            "packages": serializer.data,
+            "removed": removed,
+        })
+
+    @action(detail=False, url_path="resolve")
+    def resolve(self, request, *args, **kwargs):
+        full_version_names = parse_full_version_names(request.query_params.get("packages"))
+        return Response(resolve_dependencies(request, full_version_names))
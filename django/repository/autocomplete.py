@@ -0,0 +1,113 @@
+import time
+import threading
+
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.urls import reverse
+
+from core.cache import CacheBustCondition, get_cache_generation
+
+from repository.models import Package
+
+
+AUTOCOMPLETE_LIMIT = 10
+# Prefix matches considered when ranking, bounds the work for short prefixes
+AUTOCOMPLETE_CANDIDATES = 500
+# Minimum amount of seconds between two rebuilds of the index
+AUTOCOMPLETE_REFRESH_INTERVAL = 10
+
+
+class AutocompleteIndex(object):
+    """
+    Sorted in-memory index of package and owner names, answering name
+    prefix lookups without querying the database.
+
+    The index is rebuilt when any package is updated, at most once per
+    AUTOCOMPLETE_REFRESH_INTERVAL.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.generation = None
+        self.refreshed_at = 0
+        # Sorted lowercase names and the (downloads, owner name, package
+        # name) entries at the same positions, replaced as a whole on
+        # rebuilds. Owners are stored with a package name of None.
+        self.index = ([], [])
+
+    def refresh(self):
+        generation = get_cache_generation(CacheBustCondition.any_package_updated)
+        if generation == self.generation:
+            return
+        if self.index[0] and time.time() - self.refreshed_at < AUTOCOMPLETE_REFRESH_INTERVAL:
+            return
+        if not self.lock.acquire(blocking=not self.index[0]):
+            # Keep serving the previous index while another thread rebuilds
+            return
+        try:
+            if generation != self.generation:
+                self.build()
+                self.generation = generation
+                self.refreshed_at = time.time()
+        finally:
+            self.lock.release()
+
+    def build(self):
+        entries = []
+        owner_downloads = defaultdict(int)
+        packages = Package.objects.active().values_list("owner__name", "name", "total_downloads")
+        for owner_name, name, downloads in packages:
+            owner_downloads[owner_name] += downloads
+            entries.append((name.lower(), downloads, owner_name, name))
+        for owner_name, downloads in owner_downloads.items():
+            entries.append((owner_name.lower(), downloads, owner_name, None))
+
+        entries.sort(key=lambda entry: entry[0])
+        self.index = (
+            [entry[0] for entry in entries],
+            [entry[1:] for entry in entries],
+        )
+
+    def lookup(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        """
+        Find the most downloaded packages and owners whose name starts with
+        the given prefix.
+
+        :param prefix: The case insensitive name prefix
+        :param limit: The maximum amount of suggestions to return
+        :return: The suggestions
+        :rtype: list
+        """
+        prefix = prefix.lower()
+        if not prefix:
+            return []
+        keys, suggestions = self.index
+        start = bisect_left(keys, prefix)
+        end = min(bisect_left(keys, prefix + "\uffff"), start + AUTOCOMPLETE_CANDIDATES)
+        candidates = sorted(suggestions[start:end], key=lambda entry: -entry[0])
+        return [
+            get_suggestion(owner_name, name)
+            for downloads, owner_name, name in candidates[:limit]
+        ]
+
+
+def get_suggestion(owner_name, name):
+    if name is None:
+        return {
+            "type": "owner",
+            "name": owner_name,
+            "url": reverse("packages.list_by_owner", kwargs={"owner": owner_name}),
+        }
+    return {
+        "type": "package",
+        "name": name,
+        "owner": owner_name,
+        "url": reverse("packages.detail", kwargs={"owner": owner_name, "name": name}),
+    }
+
+
+autocomplete_index = AutocompleteIndex()
@@ -1,16 +1,36 @@
+from django.core.exceptions import ValidationError
+
 from repository.models import Package
 
-from core.cache import (
-    CacheBustCondition,
-    cache_function_result
-)
+
+# Ends with the primary key so that it can be used as a pagination keyset
+MOD_LIST_ORDERING = ("-is_pinned", "is_deprecated", "-date_updated", "-pk")
 
 
-@cache_function_result(cache_until=CacheBustCondition.any_package_updated)
 def get_mod_list_queryset():
+    # Not cached, as caching a queryset pickles the whole evaluated catalog.
+    # The list is cached as a serialized snapshot instead.
     return (
         Package.objects
         .active()
-        .prefetch_related("versions")
-        .order_by("-is_pinned", "is_deprecated", "-date_updated")
+        .prefetch_available_versions()
+        .order_by(*MOD_LIST_ORDERING)
     )
+
+
+def get_package_version_tag(queryset):
+    """
+    Identify the current version of the single package matched by the
+    queryset, see WatermarkConditionalMixin.get_watermark_object_version
+
+    :return: The modification date of the package, or None if no package
+        matches
+    :rtype: str
+    """
+    try:
+        date_modified = queryset.values_list("date_modified", flat=True).first()
+    except (ValueError, ValidationError):
+        return None
+    if date_modified is None:
+        return None
+    return date_modified.isoformat()
@@ -0,0 +1,180 @@
+import threading
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from core.cache import CacheBustCondition, get_cache_generation
+
+from repository.models import PACKAGE_TOMBSTONE_RETENTION, Package, PackageTombstone, PackageVersion
+
+
+MAX_DEPENDENCY_DEPTH = 32
+# Rows are stamped before their transaction commits, so packages changed
+# shortly before the previous refresh are loaded again
+REFRESH_OVERLAP = timedelta(minutes=1)
+
+
+class DependencyDepthError(Exception):
+    def __init__(self, full_version_name, max_depth):
+        super().__init__(
+            f"The dependencies of {full_version_name} are nested deeper than {max_depth} levels"
+        )
+
+
+class DependencyGraph(object):
+    """
+    In-memory copy of the dependencies between all package versions, used
+    to resolve dependency trees without querying the database.
+
+    The graph is refreshed whenever any package is updated, by reloading
+    only the packages which changed since the previous refresh.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.generation = None
+        self.refreshed_at = None
+        # Version pk -> (owner name, package name, version number)
+        self.versions = {}
+        # Version pk -> tuple of dependency version pks
+        self.dependencies = {}
+        # Full version name -> version pk
+        self.names = {}
+        # Package pk -> tuple of version pks
+        self.package_versions = {}
+        # Package uuid4 -> package pk
+        self.package_pks = {}
+
+    def get_full_version_name(self, version_pk):
+        return "-".join(self.versions[version_pk])
+
+    def refresh(self):
+        generation = get_cache_generation(CacheBustCondition.any_package_updated)
+        if generation == self.generation:
+            return
+        with self.lock:
+            if generation == self.generation:
+                return
+            now = timezone.now()
+            if self.refreshed_at is None or self.refreshed_at < now - PACKAGE_TOMBSTONE_RETENTION:
+                # Deletions older than the tombstones can't be followed
+                self.clear()
+                self.load_packages(Package.objects.active())
+            else:
+                threshold = self.refreshed_at - REFRESH_OVERLAP
+                deleted = (
+                    PackageTombstone.objects
+                    .filter(date_deleted__gte=threshold)
+                    .values_list("uuid4", flat=True)
+                )
+                for uuid4 in deleted:
+                    if uuid4 in self.package_pks:
+                        self.remove_package(self.package_pks.pop(uuid4))
+                self.load_packages(Package.objects.filter(date_modified__gte=threshold))
+            self.generation = generation
+            self.refreshed_at = now
+
+    def load_packages(self, queryset):
+        """
+        Replace the given packages in the graph with their current state.
+        Only active versions of active packages are added, the others are
+        removed from the graph.
+
+        :param queryset: The packages to reload
+        """
+        packages = {
+            pk: (uuid4, owner_name, name)
+            for pk, uuid4, owner_name, name
+            in queryset.values_list("pk", "uuid4", "owner__name", "name")
+        }
+        active_packages = Package.objects.active().filter(pk__in=queryset.values("pk"))
+        versions = (
+            PackageVersion.objects
+            .filter(package__in=active_packages, is_active=True)
+            .values_list("pk", "package_id", "version_number")
+        )
+        edges = (
+            PackageVersion.dependencies.through.objects
+            .filter(
+                from_packageversion__package__in=active_packages,
+                from_packageversion__is_active=True,
+            )
+            .values_list("from_packageversion_id", "to_packageversion_id")
+        )
+
+        package_versions = {pk: [] for pk in packages}
+        loaded_versions = {}
+        for version_pk, package_pk, version_number in versions:
+            if package_pk not in packages:
+                continue
+            uuid4, owner_name, name = packages[package_pk]
+            package_versions[package_pk].append(version_pk)
+            loaded_versions[version_pk] = (owner_name, name, version_number)
+        dependencies = {}
+        for version_pk, dependency_pk in edges:
+            dependencies.setdefault(version_pk, []).append(dependency_pk)
+
+        for package_pk, (uuid4, owner_name, name) in packages.items():
+            self.remove_package(package_pk)
+            self.package_pks[uuid4] = package_pk
+            self.package_versions[package_pk] = tuple(package_versions[package_pk])
+        for version_pk, version in loaded_versions.items():
+            self.versions[version_pk] = version
+            self.dependencies[version_pk] = tuple(dependencies.get(version_pk, ()))
+            self.names["-".join(version)] = version_pk
+
+    def remove_package(self, package_pk):
+        for version_pk in self.package_versions.pop(package_pk, ()):
+            version = self.versions.pop(version_pk, None)
+            self.dependencies.pop(version_pk, None)
+            if version is not None:
+                self.names.pop("-".join(version), None)
+
+    def resolve(self, full_version_names, max_depth=MAX_DEPENDENCY_DEPTH):
+        """
+        Collect the given package versions and all of their dependencies,
+        direct or indirect.
+
+        :param full_version_names: Identifiers in the Owner-Name-Version format
+        :param max_depth: The maximum amount of dependency levels to follow
+        :return: The version pks ordered so that dependencies come before
+            their dependants, the identifiers which were not found, and the
+            dependency cycles found as lists of full version names
+        :rtype: tuple
+        :raises DependencyDepthError: If dependencies are nested deeper than
+            max_depth
+        """
+        resolved = {}
+        missing = []
+        cycles = []
+        path = []
+
+        def visit(version_pk):
+            if version_pk in path:
+                cycle = path[path.index(version_pk):] + [version_pk]
+                cycles.append([self.get_full_version_name(pk) for pk in cycle])
+                return
+            if version_pk in resolved or version_pk not in self.versions:
+                return
+            if len(path) >= max_depth:
+                raise DependencyDepthError(self.get_full_version_name(path[0]), max_depth)
+            path.append(version_pk)
+            for dependency_pk in self.dependencies.get(version_pk, ()):
+                visit(dependency_pk)
+            path.pop()
+            resolved[version_pk] = None
+
+        for full_version_name in full_version_names:
+            version_pk = self.names.get(full_version_name)
+            if version_pk is None:
+                missing.append(full_version_name)
+            else:
+                visit(version_pk)
+        return list(resolved), missing, cycles
+
+
+dependency_graph = DependencyGraph()
@@ -0,0 +1,149 @@
+import uuid
+
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+
+
+DOWNLOAD_DEDUP_WINDOW = timedelta(minutes=10)
+DOWNLOAD_DEDUP_KEY_PREFIX = "downloads.dedup"
+PENDING_DOWNLOADS_KEY = "downloads.pending"
+FLUSHING_DOWNLOADS_KEY = "downloads.flushing"
+FLUSHING_BATCH_KEY = "downloads.flushing.batch"
+FLUSH_LOCK_KEY = "downloads.flush.lock"
+# Longer than a flush may take, so that a crashed flusher does not block
+# flushing for long
+FLUSH_LOCK_TIMEOUT = timedelta(minutes=5)
+
+# Counts the download only if the client has not been seen within the
+# dedup window, in a single step so that no download is lost in between
+BUFFER_DOWNLOAD_SCRIPT = """
+if redis.call("SET", KEYS[1], 1, "NX", "EX", ARGV[1]) then
+    redis.call("HINCRBY", KEYS[2], ARGV[2], 1)
+end
+"""
+# Moves the pending counters aside under a new batch id, unless a batch
+# which has not been released yet is still waiting to be flushed
+CLAIM_PENDING_DOWNLOADS_SCRIPT = """
+if redis.call("EXISTS", KEYS[2]) == 0 then
+    if redis.call("EXISTS", KEYS[1]) == 0 then
+        return false
+    end
+    redis.call("RENAME", KEYS[1], KEYS[2])
+    redis.call("SET", KEYS[3], ARGV[1])
+end
+redis.call("SET", KEYS[3], ARGV[1], "NX")
+return {redis.call("GET", KEYS[3]), redis.call("HGETALL", KEYS[2])}
+"""
+RELEASE_PENDING_DOWNLOADS_SCRIPT = """
+if redis.call("GET", KEYS[2]) == ARGV[1] then
+    redis.call("DEL", KEYS[1], KEYS[2])
+end
+"""
+RELEASE_FLUSH_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    redis.call("DEL", KEYS[1])
+end
+"""
+
+
+def is_download_buffering_enabled():
+    return settings.DOWNLOAD_COUNTER_BUFFERED
+
+
+def buffer_download(version_pk, client_ip):
+    """
+    Count a download in Redis, to be added to the database by the
+    flush_download_counters command.
+
+    Downloads by the same client are counted at most once per
+    DOWNLOAD_DEDUP_WINDOW.
+
+    :param version_pk: The primary key of the downloaded PackageVersion
+    :param client_ip: The IP address of the downloading client
+    :return: False if Redis could not be reached, True otherwise
+    :rtype: bool
+    """
+    from django_redis import get_redis_connection
+    from redis.exceptions import RedisError
+
+    try:
+        connection = get_redis_connection("default")
+        connection.register_script(BUFFER_DOWNLOAD_SCRIPT)(
+            keys=[f"{DOWNLOAD_DEDUP_KEY_PREFIX}.{version_pk}.{client_ip}", PENDING_DOWNLOADS_KEY],
+            args=[int(DOWNLOAD_DEDUP_WINDOW.total_seconds()), version_pk],
+        )
+    except RedisError:
+        return False
+    return True
+
+
+@contextmanager
+def download_flush_lock():
+    """
+    Hold the lock which allows a single flush_download_counters process to
+    flush at a time.
+
+    :return: Whether the lock was acquired
+    :rtype: bool
+    """
+    from django_redis import get_redis_connection
+
+    connection = get_redis_connection("default")
+    token = uuid.uuid4().hex
+    is_acquired = connection.set(
+        FLUSH_LOCK_KEY,
+        token,
+        nx=True,
+        ex=int(FLUSH_LOCK_TIMEOUT.total_seconds()),
+    )
+    try:
+        yield bool(is_acquired)
+    finally:
+        if is_acquired:
+            connection.register_script(RELEASE_FLUSH_LOCK_SCRIPT)(keys=[FLUSH_LOCK_KEY], args=[token])
+
+
+def claim_pending_downloads():
+    """
+    Take the downloads counted so far out of the pending counters.
+
+    The claimed counters are kept in Redis until release_pending_downloads
+    is called, and are claimed again under the same batch id if a previous
+    flush did not finish. Must be called while holding the
+    download_flush_lock.
+
+    :return: The id of the claimed batch, or None if there are no
+        downloads, and the amount of new downloads keyed by PackageVersion
+        primary key
+    :rtype: tuple
+    """
+    from django_redis import get_redis_connection
+
+    connection = get_redis_connection("default")
+    claimed = connection.register_script(CLAIM_PENDING_DOWNLOADS_SCRIPT)(
+        keys=[PENDING_DOWNLOADS_KEY, FLUSHING_DOWNLOADS_KEY, FLUSHING_BATCH_KEY],
+        args=[str(uuid.uuid4())],
+    )
+    if not claimed:
+        return None, {}
+    batch_id, counters = claimed
+    return uuid.UUID(batch_id.decode()), {
+        int(version_pk): int(count)
+        for version_pk, count in zip(counters[::2], counters[1::2])
+    }
+
+
+def release_pending_downloads(batch_id):
+    """
+    Drop the claimed counters once they have been added to the database.
+
+    :param batch_id: The id of the batch returned by claim_pending_downloads
+    """
+    from django_redis import get_redis_connection
+
+    get_redis_connection("default").register_script(RELEASE_PENDING_DOWNLOADS_SCRIPT)(
+        keys=[FLUSHING_DOWNLOADS_KEY, FLUSHING_BATCH_KEY],
+        args=[str(batch_id)],
+    )
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from core.pagination import filter_keyset, get_ordering_model_field
+
+from repository.views import MODS_PER_PAGE, PackageListView
+
+
+class Command(BaseCommand):
+    help = "Shows the query plans of the package list orderings"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Run the queries and show their actual execution (PostgreSQL only)",
+        )
+        parser.add_argument(
+            "--cursor-depth",
+            type=int,
+            default=0,
+            help="Explain the page following the given amount of packages, as reached by a cursor",
+        )
+
+    def handle(self, *args, **kwargs):
+        options = {"analyze": True} if kwargs["analyze"] else {}
+        depth = kwargs["cursor_depth"]
+        view = PackageListView()
+        for ordering, name in view.get_ordering_choices():
+            view.request = RequestFactory().get("/", {"ordering": ordering})
+            queryset = view.get_queryset()
+            if depth:
+                ordering_fields = view.get_ordering_fields()
+                cursor_row = queryset[depth - 1:depth].first()
+                if cursor_row is None:
+                    self.stdout.write(f"{name}: fewer than {depth} packages")
+                    continue
+                values = [
+                    get_ordering_model_field(queryset.model, field).value_from_object(cursor_row)
+                    for field in ordering_fields
+                ]
+                queryset = filter_keyset(queryset, ordering_fields, values, True)
+            queryset = queryset[:MODS_PER_PAGE]
+            self.stdout.write(f"{name}:")
+            self.stdout.write(queryset.explain(**options))
+            self.stdout.write("")
@@ -0,0 +1,62 @@
+import time
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from repository.downloads import (
+    claim_pending_downloads,
+    download_flush_lock,
+    release_pending_downloads,
+)
+from repository.models import PackageVersion, PackageVersionDownloadBatch
+
+
+# Batches are only claimed again until they are released, which happens
+# right after they have been added
+DOWNLOAD_BATCH_RETENTION = timedelta(days=7)
+
+
+class Command(BaseCommand):
+    help = "Adds the download counts buffered in Redis to the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep flushing every given amount of seconds",
+        )
+
+    def handle(self, *args, **kwargs):
+        if not settings.DOWNLOAD_COUNTER_BUFFERED:
+            raise CommandError("Buffered download counting is not enabled")
+
+        while True:
+            self.flush()
+            if not kwargs["interval"]:
+                return
+            time.sleep(kwargs["interval"])
+
+    def flush(self):
+        with download_flush_lock() as is_locked:
+            if not is_locked:
+                self.stdout.write("Another flush is in progress")
+                return
+            batch_id, download_counts = claim_pending_downloads()
+            if batch_id is None:
+                self.stdout.write("No downloads to flush")
+                return
+            with transaction.atomic():
+                # A batch which was added but not released is only released now
+                _, created = PackageVersionDownloadBatch.objects.get_or_create(batch_id=batch_id)
+                if created:
+                    PackageVersion.add_downloads(download_counts)
+            release_pending_downloads(batch_id)
+            PackageVersionDownloadBatch.objects.filter(
+                date_flushed__lt=timezone.now() - DOWNLOAD_BATCH_RETENTION,
+            ).delete()
+        self.stdout.write(f"Flushed downloads of {len(download_counts)} versions")
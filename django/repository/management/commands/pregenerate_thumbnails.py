@@ -0,0 +1,42 @@
+import os
+
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from repository.models import PackageVersion
+from repository.thumbnails import generate_icon_thumbnails
+
+
+def generate(icon_name):
+    # Runs in a pool process
+    generate_icon_thumbnails(icon_name)
+    return icon_name
+
+
+class Command(BaseCommand):
+    help = "Generates the missing thumbnails of every package version icon"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=os.cpu_count(),
+            help="Amount of processes to generate with",
+        )
+
+    def handle(self, *args, **kwargs):
+        icon_names = list(
+            PackageVersion.objects
+            .exclude(icon="")
+            .order_by()
+            .values_list("icon", flat=True)
+            .distinct()
+        )
+        # Pool processes are forked and must not share database connections
+        connections.close_all()
+        with Pool(kwargs["processes"]) as pool:
+            for count, icon_name in enumerate(pool.imap_unordered(generate, icon_names), 1):
+                if count % 100 == 0 or count == len(icon_names):
+                    self.stdout.write(f"Generated thumbnails for {count} of {len(icon_names)} icons")
@@ -0,0 +1,91 @@
+import os
+import signal
+
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from core.cache import CacheBustCondition, invalidate_cache, scope_cache_bust_condition
+
+from repository.models import PackageVersion, PackageVersionReadme
+from repository.readme import (
+    README_RENDER_TIMEOUT,
+    README_RENDERER_VERSION,
+    ReadmeRenderError,
+    render_readme,
+    render_readme_fallback,
+)
+
+
+def raise_render_error(signum, frame):
+    raise ReadmeRenderError()
+
+
+def render(item):
+    # Runs in a pool process, where an alarm can interrupt rendering
+    pk, readme = item
+    signal.signal(signal.SIGALRM, raise_render_error)
+    signal.alarm(README_RENDER_TIMEOUT)
+    try:
+        html = render_readme(readme)
+    except ReadmeRenderError:
+        html = render_readme_fallback(readme)
+    finally:
+        signal.alarm(0)
+    return pk, html
+
+
+class Command(BaseCommand):
+    help = "Renders the readmes which were rendered by an older renderer version"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Render every readme, including up to date ones",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=os.cpu_count(),
+            help="Amount of processes to render with",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Amount of readmes to load and store at a time",
+        )
+
+    def handle(self, *args, **kwargs):
+        queryset = PackageVersionReadme.objects.all()
+        if not kwargs["all"]:
+            queryset = queryset.exclude(renderer_version=README_RENDERER_VERSION)
+        pk_list = list(queryset.values_list("pk", flat=True))
+        batch_size = kwargs["batch_size"]
+
+        package_pks = set()
+        # Pool processes are forked and must not share database connections
+        connections.close_all()
+        with Pool(kwargs["processes"]) as pool:
+            for start in range(0, len(pk_list), batch_size):
+                batch_pks = pk_list[start:start + batch_size]
+                batch = PackageVersionReadme.objects.filter(pk__in=batch_pks)
+                items = [(readme.pk, readme.get_text()) for readme in batch]
+                with transaction.atomic():
+                    for pk, html in pool.imap_unordered(render, items):
+                        PackageVersionReadme.objects.filter(pk=pk).update(
+                            html=html,
+                            renderer_version=README_RENDERER_VERSION,
+                        )
+                package_pks.update(
+                    PackageVersion.objects
+                    .filter(pk__in=batch_pks)
+                    .values_list("package_id", flat=True)
+                )
+                self.stdout.write(f"Rendered {start + len(items)} of {len(pk_list)} readmes")
+
+        # The detail pages are cached per package
+        for package_pk in package_pks:
+            invalidate_cache(scope_cache_bust_condition(CacheBustCondition.package_updated, package_pk))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from repository.models import PackageVersionDownloadEvent
+
+
+class Command(BaseCommand):
+    help = "Rolls download events past the dedup window up into daily download statistics"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep rolling up every given amount of seconds",
+        )
+
+    def handle(self, *args, **kwargs):
+        while True:
+            count = PackageVersionDownloadEvent.rollup_expired_events()
+            self.stdout.write(f"Rolled up {count} download events")
+            if not kwargs["interval"]:
+                return
+            time.sleep(kwargs["interval"])
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0014_update_meta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='package',
+            name='date_modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='packageversion',
+            name='date_modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='PackageTombstone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uuid4', models.UUIDField()),
+                ('date_deleted', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
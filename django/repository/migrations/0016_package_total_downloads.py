@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0015_change_tracking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='package',
+            name='total_downloads',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['-is_pinned', 'is_deprecated', '-total_downloads'], name='package_downloads_order_idx'),
+        ),
+    ]
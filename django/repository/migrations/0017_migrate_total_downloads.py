@@ -0,0 +1,20 @@
+from django.db import migrations
+from django.db.models import Sum
+
+
+def migrate_total_downloads(apps, schema_editor):
+    Package = apps.get_model("repository", "Package")
+    packages = Package.objects.annotate(downloads=Sum("versions__downloads"))
+    for package in packages.iterator():
+        Package.objects.filter(pk=package.pk).update(total_downloads=package.downloads or 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0016_package_total_downloads'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrate_total_downloads, migrations.RunPython.noop),
+    ]
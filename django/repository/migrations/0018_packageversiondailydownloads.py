@@ -0,0 +1,34 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0017_migrate_total_downloads'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='packageversiondownloadevent',
+            name='last_download',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='PackageVersionDailyDownloads',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True)),
+                ('downloads', models.PositiveIntegerField(default=0)),
+                ('version', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_downloads', to='repository.PackageVersion')),
+            ],
+            options={
+                'verbose_name': 'Package Version Daily Downloads',
+                'verbose_name_plural': 'Package Version Daily Downloads',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='packageversiondailydownloads',
+            unique_together={('version', 'date')},
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0018_packageversiondailydownloads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='packageversion',
+            name='version_major',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='packageversion',
+            name='version_minor',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='packageversion',
+            name='version_patch',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='packageversion',
+            index=models.Index(fields=['package', 'is_active', '-version_major', '-version_minor', '-version_patch'], name='packageversion_ordering_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from distutils.version import StrictVersion
+
+from django.db import migrations
+
+
+def migrate_version_keys(apps, schema_editor):
+    PackageVersion = apps.get_model("repository", "PackageVersion")
+    versions = PackageVersion.objects.values_list("pk", "version_number")
+    for pk, version_number in versions.iterator():
+        major, minor, patch = StrictVersion(version_number).version
+        PackageVersion.objects.filter(pk=pk).update(
+            version_major=major,
+            version_minor=minor,
+            version_patch=patch,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0019_packageversion_version_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrate_version_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0020_migrate_version_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='package',
+            name='has_active_versions',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RemoveIndex(
+            model_name='package',
+            name='package_downloads_order_idx',
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['is_active', 'has_active_versions', '-is_pinned', 'is_deprecated', '-date_updated'], name='package_active_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['is_active', 'has_active_versions', '-is_pinned', 'is_deprecated', '-date_created'], name='package_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['is_active', 'has_active_versions', '-is_pinned', 'is_deprecated', '-total_downloads'], name='package_active_downloads_idx'),
+        ),
+    ]
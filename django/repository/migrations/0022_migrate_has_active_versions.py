@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+def migrate_has_active_versions(apps, schema_editor):
+    Package = apps.get_model("repository", "Package")
+    Package.objects.filter(versions__is_active=True).update(has_active_versions=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0021_package_has_active_versions'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrate_has_active_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0022_migrate_has_active_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='package',
+            name='package_dependencies',
+            field=models.ManyToManyField(blank=True, related_name='package_dependants', to='repository.Package'),
+        ),
+        migrations.AddField(
+            model_name='package',
+            name='dependant_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
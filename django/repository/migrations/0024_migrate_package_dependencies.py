@@ -0,0 +1,37 @@
+from django.db import migrations
+from django.db.models import Count, Q
+
+
+def migrate_package_dependencies(apps, schema_editor):
+    Package = apps.get_model("repository", "Package")
+    PackageVersion = apps.get_model("repository", "PackageVersion")
+    VersionDependency = PackageVersion.dependencies.through
+    PackageDependency = Package.package_dependencies.through
+
+    edges = (
+        VersionDependency.objects
+        .values_list("from_packageversion__package_id", "to_packageversion__package_id")
+        .distinct()
+    )
+    PackageDependency.objects.bulk_create([
+        PackageDependency(from_package_id=dependant, to_package_id=target)
+        for dependant, target in edges
+    ], batch_size=500)
+
+    packages = Package.objects.annotate(count=Count(
+        "package_dependants",
+        filter=Q(package_dependants__is_active=True, package_dependants__has_active_versions=True),
+    )).filter(count__gt=0)
+    for pk, count in packages.values_list("pk", "count"):
+        Package.objects.filter(pk=pk).update(dependant_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0023_package_dependencies'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrate_package_dependencies, migrations.RunPython.noop),
+    ]
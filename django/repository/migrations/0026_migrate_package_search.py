@@ -0,0 +1,59 @@
+from django.db import migrations
+
+
+SEARCH_INDEXES_SQL = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS package_search_vector_idx
+    ON repository_package USING gin (search_vector);
+CREATE INDEX IF NOT EXISTS package_name_trgm_idx
+    ON repository_package USING gin (name gin_trgm_ops);
+"""
+
+DROP_SEARCH_INDEXES_SQL = """
+DROP INDEX IF EXISTS package_search_vector_idx;
+DROP INDEX IF EXISTS package_name_trgm_idx;
+"""
+
+SEARCH_VECTOR_SQL = """
+UPDATE repository_package AS package SET search_vector =
+    setweight(to_tsvector('english', replace(package.name, '_', ' ')), 'A') ||
+    setweight(to_tsvector('english', owner.name), 'B') ||
+    setweight(to_tsvector('english', coalesce((
+        SELECT latest.description FROM repository_packageversion AS latest
+        WHERE latest.id = package.latest_id
+    ), '')), 'C')
+FROM repository_uploaderidentity AS owner
+WHERE owner.id = package.owner_id;
+"""
+
+
+def migrate_package_search(apps, schema_editor):
+    Package = apps.get_model("repository", "Package")
+    packages = Package.objects.select_related("owner", "latest")
+    for package in packages.iterator():
+        description = package.latest.description if package.latest else ""
+        display_name = package.name.replace("_", " ")
+        Package.objects.filter(pk=package.pk).update(
+            search_text=" ".join((package.name, display_name, package.owner.name, description)),
+        )
+
+    # The vector and the GIN indexes are only used on PostgreSQL
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(SEARCH_VECTOR_SQL)
+        schema_editor.execute(SEARCH_INDEXES_SQL)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_SEARCH_INDEXES_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0025_package_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrate_package_search, drop_search_indexes),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0026_migrate_package_search'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='package',
+            name='package_active_updated_idx',
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['is_active', 'has_active_versions', '-is_pinned', 'is_deprecated', '-date_updated', '-id'], name='package_active_updated_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='package',
+            name='package_active_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['is_active', 'has_active_versions', '-is_pinned', 'is_deprecated', '-date_created', '-id'], name='package_active_created_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='package',
+            name='package_active_downloads_idx',
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['is_active', 'has_active_versions', '-is_pinned', 'is_deprecated', '-total_downloads', '-id'], name='package_active_downloads_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+import repository.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0027_package_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PackageListing',
+            fields=[
+                ('package', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing', serialize=False, to='repository.Package')),
+                ('owner_name', models.CharField(max_length=64)),
+                ('name', models.CharField(max_length=128)),
+                ('is_active', models.BooleanField(default=False)),
+                ('is_pinned', models.BooleanField(default=False)),
+                ('is_deprecated', models.BooleanField(default=False)),
+                ('date_created', models.DateTimeField()),
+                ('date_updated', models.DateTimeField()),
+                ('total_downloads', models.PositiveIntegerField(default=0)),
+                ('version_number', models.CharField(blank=True, max_length=16)),
+                ('description', models.CharField(blank=True, max_length=256)),
+                ('icon', models.ImageField(blank=True, upload_to=repository.models.get_version_png_filepath)),
+                ('search_text', models.TextField(default='', editable=False)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='repository.UploaderIdentity')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='packagelisting',
+            index=models.Index(fields=['is_active', '-is_pinned', 'is_deprecated', '-date_updated', '-package'], name='listing_active_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='packagelisting',
+            index=models.Index(fields=['is_active', '-is_pinned', 'is_deprecated', '-date_created', '-package'], name='listing_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='packagelisting',
+            index=models.Index(fields=['is_active', '-is_pinned', 'is_deprecated', '-total_downloads', '-package'], name='listing_active_downloads_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+from django.db import migrations
+
+
+SEARCH_INDEXES_SQL = """
+DROP INDEX IF EXISTS package_name_trgm_idx;
+CREATE INDEX IF NOT EXISTS listing_search_vector_idx
+    ON repository_packagelisting USING gin (search_vector);
+CREATE INDEX IF NOT EXISTS listing_name_trgm_idx
+    ON repository_packagelisting USING gin (name gin_trgm_ops);
+"""
+
+DROP_SEARCH_INDEXES_SQL = """
+DROP INDEX IF EXISTS listing_search_vector_idx;
+DROP INDEX IF EXISTS listing_name_trgm_idx;
+CREATE INDEX IF NOT EXISTS package_name_trgm_idx
+    ON repository_package USING gin (name gin_trgm_ops);
+"""
+
+SEARCH_VECTOR_SQL = """
+UPDATE repository_packagelisting SET search_vector =
+    setweight(to_tsvector('english', replace(name, '_', ' ')), 'A') ||
+    setweight(to_tsvector('english', owner_name), 'B') ||
+    setweight(to_tsvector('english', description), 'C');
+"""
+
+
+def migrate_package_listings(apps, schema_editor):
+    Package = apps.get_model("repository", "Package")
+    PackageListing = apps.get_model("repository", "PackageListing")
+    packages = Package.objects.select_related("owner", "latest")
+    listings = []
+    for package in packages.iterator():
+        latest = package.latest
+        description = latest.description if latest else ""
+        display_name = package.name.replace("_", " ")
+        listings.append(PackageListing(
+            package_id=package.pk,
+            owner_id=package.owner_id,
+            owner_name=package.owner.name,
+            name=package.name,
+            is_active=package.is_active and package.has_active_versions,
+            is_pinned=package.is_pinned,
+            is_deprecated=package.is_deprecated,
+            date_created=package.date_created,
+            date_updated=package.date_updated,
+            total_downloads=package.total_downloads,
+            version_number=latest.version_number if latest else "",
+            description=description,
+            icon=latest.icon.name if latest else "",
+            search_text=package.search_text,
+        ))
+    PackageListing.objects.bulk_create(listings, batch_size=400)
+
+    # The vector and the GIN indexes are only used on PostgreSQL
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(SEARCH_VECTOR_SQL)
+        schema_editor.execute(SEARCH_INDEXES_SQL)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_SEARCH_INDEXES_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0028_packagelisting'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrate_package_listings, drop_search_indexes),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0029_migrate_package_listings'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='package',
+            name='search_text',
+        ),
+        migrations.RemoveField(
+            model_name='package',
+            name='search_vector',
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0030_remove_package_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PackageVersionReadme',
+            fields=[
+                ('version', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='readme_content', serialize=False, to='repository.PackageVersion')),
+                ('encoding', models.CharField(choices=[('plain', 'plain'), ('zlib', 'zlib')], default='plain', max_length=16)),
+                ('content', models.BinaryField()),
+            ],
+        ),
+    ]
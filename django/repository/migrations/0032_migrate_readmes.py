@@ -0,0 +1,46 @@
+import zlib
+
+from django.db import migrations
+
+
+# Matches repository.models.README_COMPRESSION_THRESHOLD at the time of writing
+README_COMPRESSION_THRESHOLD = 1024
+
+
+def migrate_readmes(apps, schema_editor):
+    PackageVersion = apps.get_model("repository", "PackageVersion")
+    PackageVersionReadme = apps.get_model("repository", "PackageVersionReadme")
+    readmes = []
+    versions = PackageVersion.objects.values_list("pk", "readme")
+    for version_pk, readme in versions.iterator():
+        content = readme.encode("utf-8")
+        encoding = "plain"
+        if len(content) >= README_COMPRESSION_THRESHOLD:
+            content = zlib.compress(content, 9)
+            encoding = "zlib"
+        readmes.append(PackageVersionReadme(version_id=version_pk, encoding=encoding, content=content))
+        if len(readmes) >= 400:
+            PackageVersionReadme.objects.bulk_create(readmes)
+            readmes = []
+    PackageVersionReadme.objects.bulk_create(readmes)
+
+
+def restore_readmes(apps, schema_editor):
+    PackageVersion = apps.get_model("repository", "PackageVersion")
+    PackageVersionReadme = apps.get_model("repository", "PackageVersionReadme")
+    for readme in PackageVersionReadme.objects.iterator():
+        content = bytes(readme.content)
+        if readme.encoding == "zlib":
+            content = zlib.decompress(content)
+        PackageVersion.objects.filter(pk=readme.version_id).update(readme=content.decode("utf-8"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0031_packageversionreadme'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrate_readmes, restore_readmes),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0032_migrate_readmes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='packageversion',
+            name='readme',
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0033_remove_packageversion_readme'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='packageversionreadme',
+            name='html',
+            field=models.TextField(default=''),
+        ),
+        migrations.AddField(
+            model_name='packageversionreadme',
+            name='renderer_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
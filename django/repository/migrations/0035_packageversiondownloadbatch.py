@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repository', '0034_packageversionreadme_html'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PackageVersionDownloadBatch',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_id', models.UUIDField(unique=True)),
+                ('date_flushed', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
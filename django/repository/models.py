@@ -1,24 +1,56 @@
+import threading
 import uuid
+import zlib
 
+from collections import defaultdict
 from datetime import timedelta
 from distutils.version import StrictVersion
 
 from ipware import get_client_ip
 
 from django.conf import settings
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.files.storage import get_storage_class
-from django.db import models, transaction
-from django.db.models import Case, When, Sum, Q, signals
+from django.db import connection, models, transaction
+from django.db.models import Case, Count, When, F, OuterRef, Subquery, Sum, Prefetch, Value, signals
+from django.db.models.functions import Coalesce
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.functional import cached_property
+from django.utils.safestring import mark_safe
 
-from core.cache import CacheBustCondition, invalidate_cache
+from core.cache import (
+    CacheBustCondition,
+    invalidate_cache,
+    scope_cache_bust_condition,
+)
 from core.utils import ChoiceEnum
 
+from repository.downloads import (
+    DOWNLOAD_DEDUP_WINDOW,
+    buffer_download,
+    is_download_buffering_enabled,
+)
+from repository.readme import (
+    README_RENDERER_VERSION,
+    ReadmeRenderError,
+    render_readme_fallback,
+    render_readme_isolated,
+)
+
 from webhooks.models import Webhook, WebhookType
 
 
+SEARCH_CONFIG = "english"
+
+
+# Orders versions from the newest to the oldest
+VERSION_ORDERING = ("-version_major", "-version_minor", "-version_patch")
+
+# Readmes shorter than this are stored uncompressed
+README_COMPRESSION_THRESHOLD = 1024
+
+
 class UploaderIdentityMemberRole(ChoiceEnum):
     owner = "owner"
     member = "member"
@@ -82,16 +114,64 @@ class UploaderIdentity(models.Model):
         assert identity.members.filter(user=user).exists()
         return identity
 
+    @staticmethod
+    def post_save(sender, instance, created, **kwargs):
+        if not created:
+            # The owner name is part of the package names, which copies
+            # such as the dependency graph pick up by date_modified
+            instance.owned_packages.update(date_modified=timezone.now())
+            # Listings hold the owner name for display and search
+            for package in instance.owned_packages.select_related("latest"):
+                PackageListing.update_for_package(package)
+            invalidate_cache(CacheBustCondition.any_package_updated)
+            invalidate_cache(scope_cache_bust_condition(CacheBustCondition.owner_packages_updated, instance.pk))
+
+
+signals.post_save.connect(UploaderIdentity.post_save, sender=UploaderIdentity)
+
 
 class PackageQueryset(models.QuerySet):
     def active(self):
+        return self.filter(is_active=True, has_active_versions=True)
+
+    def prefetch_available_versions(self):
+        """
+        Fetch the owners, available versions and version dependencies of all
+        packages up front, so that serializing any number of packages takes
+        a fixed number of queries.
+
+        The versions are stored in `prefetched_available_versions`, see
+        Package.get_available_versions_list
+        """
+        dependencies = PackageVersion.objects.select_related("package__owner")
+        versions = (
+            PackageVersion.objects
+            .filter(is_active=True)
+            .order_by(*VERSION_ORDERING)
+            .prefetch_related(Prefetch("dependencies", queryset=dependencies))
+        )
         return (
             self
-            .exclude(is_active=False)
-            .exclude(~Q(versions__is_active=True))
+            .select_related("owner")
+            .prefetch_related(Prefetch(
+                "versions",
+                queryset=versions,
+                to_attr="prefetched_available_versions",
+            ))
         )
 
 
+# The packages being deleted by the current thread. Their versions are
+# deleted along with them and must not write the package back meanwhile.
+deleting_packages = threading.local()
+
+
+def get_deleting_package_pks():
+    if not hasattr(deleting_packages, "pks"):
+        deleting_packages.pks = set()
+    return deleting_packages.pks
+
+
 class Package(models.Model):
     objects = PackageQueryset.as_manager()
     owner = models.ForeignKey(
@@ -105,6 +185,11 @@ class Package(models.Model):
     is_active = models.BooleanField(
         default=True,
     )
+    # Whether any version of the package is active, kept up to date as
+    # versions are created, changed or deleted
+    has_active_versions = models.BooleanField(
+        default=False,
+    )
     is_deprecated = models.BooleanField(
         default=False,
     )
@@ -114,6 +199,12 @@ class Package(models.Model):
     date_updated = models.DateTimeField(
         auto_now_add=True,
     )
+    # Bumped on any change to the package or its versions, see the
+    # change feed in the v1 API
+    date_modified = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+    )
     uuid4 = models.UUIDField(
         default=uuid.uuid4,
         editable=False,
@@ -129,8 +220,40 @@ class Package(models.Model):
         null=True,
     )
 
+    total_downloads = models.PositiveIntegerField(
+        default=0,
+    )
+
+    # The packages any version of this package depends on, kept up to date
+    # from the version dependencies
+    package_dependencies = models.ManyToManyField(
+        "self",
+        related_name="package_dependants",
+        symmetrical=False,
+        blank=True,
+    )
+    # Amount of active packages depending on this package
+    dependant_count = models.PositiveIntegerField(
+        default=0,
+    )
+
     class Meta:
         unique_together = ("owner", "name")
+        # Support the orderings of the package list on active packages
+        indexes = [
+            models.Index(
+                fields=["is_active", "has_active_versions", "-is_pinned", "is_deprecated", "-date_updated", "-id"],
+                name="package_active_updated_idx",
+            ),
+            models.Index(
+                fields=["is_active", "has_active_versions", "-is_pinned", "is_deprecated", "-date_created", "-id"],
+                name="package_active_created_idx",
+            ),
+            models.Index(
+                fields=["is_active", "has_active_versions", "-is_pinned", "is_deprecated", "-total_downloads", "-id"],
+                name="package_active_downloads_idx",
+            ),
+        ]
 
     @property
     def full_package_name(self):
@@ -142,17 +265,16 @@ class Package(models.Model):
 
     @cached_property
     def available_versions(self):
-        # TODO: Caching
-        versions = self.versions.filter(is_active=True).values_list("pk", "version_number")
-        ordered = sorted(versions, key=lambda version: StrictVersion(version[1]))
-        pk_list = [version[0] for version in reversed(ordered)]
-        preserved = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(pk_list)])
-        return self.versions.filter(pk__in=pk_list).order_by(preserved)
+        return self.versions.filter(is_active=True).order_by(*VERSION_ORDERING)
 
-    @cached_property
+    def get_available_versions_list(self):
+        if not hasattr(self, "prefetched_available_versions"):
+            return list(self.available_versions)
+        return self.prefetched_available_versions
+
+    @property
     def downloads(self):
-        # TODO: Caching
-        return self.versions.aggregate(downloads=Sum("downloads"))["downloads"]
+        return self.total_downloads
 
     @property
     def icon(self):
@@ -179,23 +301,16 @@ class Package(models.Model):
         return (
             self.latest.dependencies
             .select_related("package")
-            .annotate(total_downloads=Sum("package__versions__downloads"))
-            .order_by("-package__is_pinned", "-total_downloads")
+            .order_by("-package__is_pinned", "-package__total_downloads")
         )
 
-    @cached_property
+    @property
     def is_effectively_active(self):
-        return (
-            self.is_active and
-            self.versions.filter(is_active=True).count() > 0
-        )
+        return self.is_active and self.has_active_versions
 
-    @cached_property
+    @property
     def dependants(self):
-        # TODO: Caching
-        return Package.objects.exclude(~Q(
-            versions__dependencies__package=self,
-        )).active()
+        return self.package_dependants.active()
 
     @property
     def owner_url(self):
@@ -215,6 +330,10 @@ class Package(models.Model):
     def readme(self):
         return self.latest.readme
 
+    @property
+    def readme_html(self):
+        return self.latest.readme_html
+
     def get_absolute_url(self):
         return reverse(
             "packages.detail",
@@ -229,38 +348,170 @@ class Package(models.Model):
             "path": self.get_absolute_url()
         }
 
+    # Kept up to date by queryset updates or recomputed from the versions,
+    # so a full save of an instance loaded earlier must not write them back
+    DERIVED_FIELDS = ("has_active_versions", "total_downloads", "dependant_count")
+
+    def get_save_fields(self, *derived_fields):
+        """
+        List the fields written by save, which excludes the derived fields
+        unless they are recomputed by the caller.
+
+        :param derived_fields: The derived fields to include
+        :return: The names of the fields to save
+        :rtype: list
+        """
+        return [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key and (field.name not in self.DERIVED_FIELDS or field.name in derived_fields)
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get("force_insert") and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = self.get_save_fields()
+        super().save(*args, **kwargs)
+
     def recache_latest(self):
         self.latest = self.available_versions.first()
-        self.save()
+        self.has_active_versions = self.latest is not None
+        self.save(update_fields=self.get_save_fields("has_active_versions"))
 
     def handle_created_version(self, version):
+        self._is_versions_changed = True
         self.date_updated = timezone.now()
         self.is_deprecated = False
         if self.latest:
-            new_version = StrictVersion(version.version_number)
-            old_version = StrictVersion(self.latest.version_number)
-            if new_version > old_version:
+            if version.version_key > self.latest.version_key:
                 self.latest = version
         else:
             self.latest = version
-        self.save()
+        self.has_active_versions = self.available_versions.exists()
+        self.recache_total_downloads()
+        self.save(update_fields=self.get_save_fields("has_active_versions"))
+
+    def recache_total_downloads(self):
+        # Download counters are incremented in the database directly, so the
+        # sum is computed by the database as well instead of from the values
+        # held by this instance
+        version_downloads = (
+            PackageVersion.objects
+            .filter(package=OuterRef("pk"))
+            .order_by()
+            .values("package")
+            .annotate(downloads=Sum("downloads"))
+            .values("downloads")
+        )
+        Package.objects.filter(pk=self.pk).update(
+            total_downloads=Coalesce(Subquery(version_downloads), 0),
+        )
+        self.refresh_from_db(fields=["total_downloads"])
+
+    def handle_updated_version(self, version):
+        self._is_versions_changed = True
+        self.recache_total_downloads()
+        self.recache_latest()
 
     def handle_deleted_version(self, version):
+        self._is_versions_changed = True
+        self.recache_total_downloads()
+        self.recache_package_dependencies()
         self.recache_latest()
 
     def __str__(self):
         return self.full_package_name
 
+    def get_cache_bust_conditions(self, is_catalog_changed=True):
+        """
+        List the cache bust conditions covering this package.
+
+        :param is_catalog_changed: Whether the package lists and the API may
+            have changed, which is the case when the versions or the listed
+            fields of the package changed
+        :return: The conditions to invalidate
+        :rtype: list
+        """
+        conditions = [
+            scope_cache_bust_condition(CacheBustCondition.package_updated, self.pk),
+            scope_cache_bust_condition(CacheBustCondition.owner_packages_updated, self.owner_id),
+        ]
+        if is_catalog_changed:
+            conditions.insert(0, CacheBustCondition.any_package_updated)
+        # The packages this package depends on list it as a dependant, both
+        # in their dependant count and on their dependants listing
+        dependency_targets = (
+            Package.objects
+            .filter(versions__dependants__package=self)
+            .values_list("pk", flat=True)
+            .distinct()
+        )
+        for target in dependency_targets:
+            conditions.append(scope_cache_bust_condition(CacheBustCondition.package_updated, target))
+            conditions.append(scope_cache_bust_condition(CacheBustCondition.package_dependants_updated, target))
+        return conditions
+
+    def invalidate_caches(self, is_catalog_changed=True):
+        for condition in self.get_cache_bust_conditions(is_catalog_changed):
+            invalidate_cache(condition)
+
+    def recache_package_dependencies(self):
+        previous_targets = set(self.package_dependencies.values_list("pk", flat=True))
+        targets = set(
+            Package.objects
+            .filter(versions__dependants__package=self)
+            .values_list("pk", flat=True)
+        )
+        self.package_dependencies.set(targets)
+        Package.recache_dependant_counts(previous_targets | targets)
+
+    @staticmethod
+    def recache_dependant_counts(pk_list):
+        dependant_counts = (
+            Package.objects
+            .active()
+            .filter(package_dependencies=OuterRef("pk"))
+            .order_by()
+            .values("package_dependencies")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        Package.objects.filter(pk__in=pk_list).update(
+            dependant_count=Coalesce(Subquery(dependant_counts), 0),
+        )
+
     @staticmethod
     def post_save(sender, instance, created, **kwargs):
-        invalidate_cache(CacheBustCondition.any_package_updated)
+        # The package may have been (de)activated, which changes the
+        # dependant counts of the packages it depends on
+        Package.recache_dependant_counts(
+            instance.package_dependencies.values_list("pk", flat=True),
+        )
+        is_listing_changed = PackageListing.update_for_package(instance)
+        # Saves which change neither the versions nor the listed and ordered
+        # fields, such as most admin edits, leave the package lists alone
+        instance.invalidate_caches(
+            is_catalog_changed=created or is_listing_changed or getattr(instance, "_is_versions_changed", False),
+        )
+        instance._is_versions_changed = False
 
     @staticmethod
-    def post_delete(sender, instance, created, **kwargs):
-        invalidate_cache(CacheBustCondition.any_package_updated)
+    def pre_delete(sender, instance, **kwargs):
+        get_deleting_package_pks().add(instance.pk)
+        dependency_targets = list(instance.package_dependencies.values_list("pk", flat=True))
+        instance.package_dependencies.clear()
+        Package.recache_dependant_counts(dependency_targets)
+
+    @staticmethod
+    def post_delete(sender, instance, **kwargs):
+        get_deleting_package_pks().discard(instance.pk)
+        PackageTombstone.objects.create(uuid4=instance.uuid4)
+        PackageTombstone.objects.filter(
+            date_deleted__lt=timezone.now() - PACKAGE_TOMBSTONE_RETENTION,
+        ).delete()
+        instance.invalidate_caches()
 
 
 signals.post_save.connect(Package.post_save, sender=Package)
+signals.pre_delete.connect(Package.pre_delete, sender=Package)
 signals.post_delete.connect(Package.post_delete, sender=Package)
 
 
@@ -272,7 +523,17 @@ def get_version_png_filepath(instance, filename):
     return f"{instance}.png"
 
 
+class PackageVersionQueryset(models.QuerySet):
+    def with_readme(self):
+        """
+        Fetch the readmes along with the versions. Readmes are stored
+        separately and are otherwise loaded on access, one query each.
+        """
+        return self.select_related("readme_content")
+
+
 class PackageVersion(models.Model):
+    objects = PackageVersionQueryset.as_manager()
     package = models.ForeignKey(
         Package,
         related_name="versions",
@@ -284,6 +545,10 @@ class PackageVersion(models.Model):
     date_created = models.DateTimeField(
         auto_now_add=True,
     )
+    date_modified = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+    )
     downloads = models.PositiveIntegerField(
         default=0
     )
@@ -294,6 +559,16 @@ class PackageVersion(models.Model):
     version_number = models.CharField(
         max_length=16,
     )
+    # Populated from version_number on save, see VERSION_ORDERING
+    version_major = models.BigIntegerField(
+        default=0,
+    )
+    version_minor = models.BigIntegerField(
+        default=0,
+    )
+    version_patch = models.BigIntegerField(
+        default=0,
+    )
     website_url = models.CharField(
         max_length=1024,
     )
@@ -306,7 +581,6 @@ class PackageVersion(models.Model):
         symmetrical=False,
         blank=True,
     )
-    readme = models.TextField()
 
     # <packagename>.zip
     file = models.FileField(
@@ -324,6 +598,39 @@ class PackageVersion(models.Model):
 
     class Meta:
         unique_together = ("package", "version_number")
+        indexes = [
+            models.Index(
+                fields=["package", "is_active", "-version_major", "-version_minor", "-version_patch"],
+                name="packageversion_ordering_idx",
+            ),
+        ]
+
+    @property
+    def readme(self):
+        if not hasattr(self, "_readme"):
+            try:
+                self._readme = self.readme_content.get_text()
+            except PackageVersionReadme.DoesNotExist:
+                self._readme = ""
+        return self._readme
+
+    @readme.setter
+    def readme(self, readme):
+        # Written to PackageVersionReadme by post_save
+        self._readme = readme
+        self._is_readme_changed = True
+
+    @property
+    def readme_html(self):
+        try:
+            readme_content = self.readme_content
+        except PackageVersionReadme.DoesNotExist:
+            return ""
+        return mark_safe(readme_content.get_html())
+
+    @property
+    def version_key(self):
+        return (self.version_major, self.version_minor, self.version_patch)
 
     def get_absolute_url(self):
         return reverse(
@@ -373,14 +680,39 @@ class PackageVersion(models.Model):
         }
 
     @staticmethod
-    def post_save(sender, instance, created, **kwargs):
+    def pre_save(sender, instance, **kwargs):
+        version = StrictVersion(instance.version_number).version
+        instance.version_major, instance.version_minor, instance.version_patch = version
+
+    @staticmethod
+    def post_save(sender, instance, created, update_fields, **kwargs):
+        if getattr(instance, "_is_readme_changed", False):
+            PackageVersionReadme.store(instance, instance.readme)
+            instance._is_readme_changed = False
         if created:
             instance.package.handle_created_version(instance)
             instance.announce_release()
+        elif update_fields is None:
+            instance.package.handle_updated_version(instance)
 
     @staticmethod
     def post_delete(sender, instance, **kwargs):
-        instance.package.handle_deleted_version(instance)
+        if instance.package_id not in get_deleting_package_pks():
+            instance.package.handle_deleted_version(instance)
+
+    @staticmethod
+    def dependencies_changed(sender, instance, action, reverse, **kwargs):
+        if reverse:
+            return
+        # Invalidate before removals and after additions so that both the
+        # old and the new dependency targets are covered
+        if action in ("post_add", "pre_remove", "pre_clear"):
+            now = timezone.now()
+            PackageVersion.objects.filter(pk=instance.pk).update(date_modified=now)
+            Package.objects.filter(pk=instance.package_id).update(date_modified=now)
+            instance.package.invalidate_caches()
+        if action in ("post_add", "post_remove", "post_clear"):
+            instance.package.recache_package_dependencies()
 
     def announce_release(self):
         webhooks = Webhook.objects.filter(
@@ -427,6 +759,9 @@ class PackageVersion(models.Model):
         if client_ip is None:
             return
 
+        if is_download_buffering_enabled() and buffer_download(self.pk, client_ip):
+            return
+
         download_event, created = PackageVersionDownloadEvent.objects.get_or_create(
             version=self,
             source_ip=client_ip,
@@ -438,15 +773,310 @@ class PackageVersion(models.Model):
             valid = download_event.count_downloads_and_return_validity()
 
         if valid:
-            self.downloads += 1
-            self.save(update_fields=("downloads",))
+            self.increase_download_counter()
+
+    def increase_download_counter(self):
+        with transaction.atomic():
+            PackageVersion.objects.filter(pk=self.pk).update(downloads=F("downloads") + 1)
+            Package.objects.filter(pk=self.package_id).update(total_downloads=F("total_downloads") + 1)
+            PackageListing.objects.filter(pk=self.package_id).update(total_downloads=F("total_downloads") + 1)
+        self.downloads += 1
+
+    @staticmethod
+    def add_downloads(download_counts, batch_size=500):
+        """
+        Add download counts collected outside of the database in bulk.
+
+        :param download_counts: The amount of new downloads keyed by
+            PackageVersion primary key
+        :param batch_size: The amount of versions to update per query
+        """
+        version_pks = list(download_counts.keys())
+        with transaction.atomic():
+            for start in range(0, len(version_pks), batch_size):
+                batch = version_pks[start:start + batch_size]
+                version_counts = {}
+                package_counts = defaultdict(int)
+                versions = PackageVersion.objects.filter(pk__in=batch)
+                for version_pk, package_pk in versions.values_list("pk", "package_id"):
+                    version_counts[version_pk] = download_counts[version_pk]
+                    package_counts[package_pk] += download_counts[version_pk]
+                versions.update(
+                    downloads=F("downloads") + get_count_expression(version_counts),
+                )
+                Package.objects.filter(pk__in=package_counts.keys()).update(
+                    total_downloads=F("total_downloads") + get_count_expression(package_counts),
+                )
+                PackageListing.objects.filter(pk__in=package_counts.keys()).update(
+                    total_downloads=F("total_downloads") + get_count_expression(package_counts),
+                )
+                PackageVersionDailyDownloads.add_downloads(timezone.localdate(), version_counts)
 
     def __str__(self):
         return self.full_version_name
 
 
+def get_count_expression(counts, field="pk"):
+    return Case(
+        *[When(**{field: pk, "then": Value(count)}) for pk, count in counts.items()],
+        default=Value(0),
+        output_field=models.PositiveIntegerField(),
+    )
+
+
+signals.pre_save.connect(PackageVersion.pre_save, sender=PackageVersion)
 signals.post_save.connect(PackageVersion.post_save, sender=PackageVersion)
 signals.post_delete.connect(PackageVersion.post_delete, sender=PackageVersion)
+signals.m2m_changed.connect(
+    PackageVersion.dependencies_changed,
+    sender=PackageVersion.dependencies.through,
+)
+
+
+class ReadmeEncoding(ChoiceEnum):
+    plain = "plain"
+    zlib = "zlib"
+
+
+class PackageVersionReadme(models.Model):
+    """
+    The readme of a package version, kept out of the PackageVersion table
+    as only the detail pages render it. See PackageVersion.readme
+    """
+    version = models.OneToOneField(
+        "repository.PackageVersion",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="readme_content",
+    )
+    encoding = models.CharField(
+        max_length=16,
+        default=ReadmeEncoding.plain,
+        choices=ReadmeEncoding.as_choices(),
+    )
+    content = models.BinaryField()
+    # Rendered when stored, see repository.readme
+    html = models.TextField(
+        default="",
+    )
+    renderer_version = models.PositiveIntegerField(
+        default=0,
+    )
+
+    def get_text(self):
+        content = bytes(self.content)
+        if self.encoding == ReadmeEncoding.zlib:
+            content = zlib.decompress(content)
+        return content.decode("utf-8")
+
+    def get_html(self):
+        # Readmes of an older renderer version are re-rendered by the
+        # render_readmes command, until then their previous HTML is served
+        if self.html or self.renderer_version == README_RENDERER_VERSION:
+            return self.html
+        return render_readme_fallback(self.get_text())
+
+    @staticmethod
+    def store(version, readme):
+        """
+        Store the readme of a version, compressing it if it's long.
+
+        :param version: The PackageVersion which the readme belongs to
+        :param readme: The readme text
+        :return: The stored readme
+        :rtype: PackageVersionReadme
+        """
+        content = readme.encode("utf-8")
+        encoding = ReadmeEncoding.plain
+        if len(content) >= README_COMPRESSION_THRESHOLD:
+            content = zlib.compress(content, 9)
+            encoding = ReadmeEncoding.zlib
+        readme_content, created = PackageVersionReadme.objects.update_or_create(
+            version=version,
+            defaults={
+                "encoding": encoding,
+                "content": content,
+                "html": render_html(readme),
+                "renderer_version": README_RENDERER_VERSION,
+            },
+        )
+        version.readme_content = readme_content
+        return readme_content
+
+    def __str__(self):
+        return str(self.version)
+
+
+def render_html(readme):
+    try:
+        return render_readme_isolated(readme)
+    except ReadmeRenderError:
+        return render_readme_fallback(readme)
+
+
+class PackageListingQueryset(models.QuerySet):
+    def active(self):
+        return self.filter(is_active=True)
+
+
+class PackageListingManager(models.Manager.from_queryset(PackageListingQueryset)):
+    def get_queryset(self):
+        # The search document is only used within queries
+        return super().get_queryset().defer("search_text", "search_vector")
+
+
+class PackageListing(models.Model):
+    """
+    Denormalized copy of what the package listings display, search and
+    order by, so that a page of packages is fetched with a single query on
+    a single table.
+
+    Rewritten from Package.post_save, which also runs whenever a version
+    changes, and within the same transaction as the write causing it.
+    """
+    objects = PackageListingManager()
+    package = models.OneToOneField(
+        "repository.Package",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="listing",
+    )
+    owner = models.ForeignKey(
+        "repository.UploaderIdentity",
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    owner_name = models.CharField(
+        max_length=64,
+    )
+    name = models.CharField(
+        max_length=128,
+    )
+    # Package.is_effectively_active
+    is_active = models.BooleanField(
+        default=False,
+    )
+    is_pinned = models.BooleanField(
+        default=False,
+    )
+    is_deprecated = models.BooleanField(
+        default=False,
+    )
+    date_created = models.DateTimeField()
+    date_updated = models.DateTimeField()
+    total_downloads = models.PositiveIntegerField(
+        default=0,
+    )
+
+    # Fields of the latest version
+    version_number = models.CharField(
+        max_length=16,
+        blank=True,
+    )
+    description = models.CharField(
+        max_length=256,
+        blank=True,
+    )
+    icon = models.ImageField(
+        upload_to=get_version_png_filepath,
+        blank=True,
+    )
+
+    # Search document. The vector and its indexes are only maintained on
+    # PostgreSQL, see PackageListSearchView
+    search_text = models.TextField(
+        default="",
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+    )
+
+    class Meta:
+        # Support the orderings of the package list on active packages
+        indexes = [
+            models.Index(
+                fields=["is_active", "-is_pinned", "is_deprecated", "-date_updated", "-package"],
+                name="listing_active_updated_idx",
+            ),
+            models.Index(
+                fields=["is_active", "-is_pinned", "is_deprecated", "-date_created", "-package"],
+                name="listing_active_created_idx",
+            ),
+            models.Index(
+                fields=["is_active", "-is_pinned", "is_deprecated", "-total_downloads", "-package"],
+                name="listing_active_downloads_idx",
+            ),
+        ]
+
+    @property
+    def display_name(self):
+        return self.name.replace("_", " ")
+
+    @property
+    def downloads(self):
+        return self.total_downloads
+
+    @property
+    def owner_url(self):
+        return reverse("packages.list_by_owner", kwargs={"owner": self.owner_name})
+
+    def get_absolute_url(self):
+        return reverse(
+            "packages.detail",
+            kwargs={"owner": self.owner_name, "name": self.name}
+        )
+
+    @staticmethod
+    def update_for_package(package):
+        """
+        Write the listing of a package from its current state.
+
+        :param package: The Package which to list
+        :return: Whether the listed fields changed
+        :rtype: bool
+        """
+        latest = package.latest
+        description = latest.description if latest else ""
+        display_name = package.display_name
+        owner_name = package.owner.name
+        # Read from the database, as has_active_versions is not written by
+        # full saves and may be stale on the given package
+        is_active = Package.objects.active().filter(pk=package.pk).exists()
+        listed_fields = {
+            "owner_id": package.owner_id,
+            "owner_name": owner_name,
+            "name": package.name,
+            "is_active": is_active,
+            "is_pinned": package.is_pinned,
+            "is_deprecated": package.is_deprecated,
+            "date_created": package.date_created,
+            "date_updated": package.date_updated,
+            "version_number": latest.version_number if latest else "",
+            "description": description,
+            "icon": latest.icon.name if latest else "",
+            "search_text": " ".join((package.name, display_name, owner_name, description)),
+        }
+        current_fields = PackageListing.objects.filter(pk=package.pk).values(*listed_fields).first()
+        is_changed = current_fields != listed_fields
+        if is_changed:
+            PackageListing.objects.update_or_create(package=package, defaults=listed_fields)
+        # Copied by the database, as download counters are incremented there
+        # and the value held by the package may be stale
+        PackageListing.objects.filter(pk=package.pk).update(
+            total_downloads=Subquery(Package.objects.filter(pk=package.pk).values("total_downloads")),
+        )
+        if is_changed and connection.vendor == "postgresql":
+            PackageListing.objects.filter(pk=package.pk).update(search_vector=(
+                SearchVector(Value(display_name), weight="A", config=SEARCH_CONFIG) +
+                SearchVector(Value(owner_name), weight="B", config=SEARCH_CONFIG) +
+                SearchVector(Value(description), weight="C", config=SEARCH_CONFIG)
+            ))
+        return is_changed
+
+    def __str__(self):
+        return f"{self.owner_name}-{self.name}"
 
 
 class PackageVersionDownloadEvent(models.Model):
@@ -456,7 +1086,10 @@ class PackageVersionDownloadEvent(models.Model):
         on_delete=models.CASCADE,
     )
     source_ip = models.GenericIPAddressField()
-    last_download = models.DateTimeField(auto_now_add=True)
+    last_download = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+    )
     total_downloads = models.PositiveIntegerField(
         default=1
     )
@@ -465,16 +1098,149 @@ class PackageVersionDownloadEvent(models.Model):
     )
 
     def count_downloads_and_return_validity(self):
-        self.total_downloads += 1
-        is_valid = False
-
-        if self.last_download + timedelta(minutes=10) < timezone.now():
-            self.counted_downloads += 1
-            self.last_download = timezone.now()
-            is_valid = True
+        # Decided by filtered updates, as the event may be counted or rolled
+        # up by rollup_expired_events since it was loaded
+        now = timezone.now()
+        events = PackageVersionDownloadEvent.objects.filter(pk=self.pk)
+        is_counted = events.filter(last_download__lt=now - DOWNLOAD_DEDUP_WINDOW).update(
+            total_downloads=F("total_downloads") + 1,
+            counted_downloads=F("counted_downloads") + 1,
+            last_download=now,
+        )
+        if is_counted:
+            return True
+        if events.update(total_downloads=F("total_downloads") + 1):
+            return False
+        # Rolled up meanwhile, so the download starts a new event
+        event, created = PackageVersionDownloadEvent.objects.get_or_create(
+            version_id=self.version_id,
+            source_ip=self.source_ip,
+        )
+        return created
 
-        self.save(update_fields=("total_downloads", "counted_downloads", "last_download"))
-        return is_valid
+    @staticmethod
+    def rollup_expired_events(batch_size=1000):
+        """
+        Add the counted downloads of events past the dedup window to the
+        daily download statistics and delete the events.
+
+        Downloads are attributed to the day of the last counted download of
+        an event. As events are rolled up shortly after the dedup window
+        passes, they rarely span more than a single day.
+
+        :param batch_size: The amount of events to roll up per transaction
+        :return: The amount of events rolled up
+        :rtype: int
+        """
+        threshold = timezone.now() - DOWNLOAD_DEDUP_WINDOW
+        total = 0
+        while True:
+            with transaction.atomic():
+                events = list(
+                    PackageVersionDownloadEvent.objects
+                    .select_for_update()
+                    .filter(last_download__lt=threshold)
+                    .order_by("pk")
+                    .values_list("pk", "version_id", "last_download", "counted_downloads")
+                    [:batch_size]
+                )
+                if not events:
+                    return total
+
+                daily_counts = defaultdict(lambda: defaultdict(int))
+                for pk, version_pk, last_download, counted_downloads in events:
+                    date = timezone.localdate(last_download)
+                    daily_counts[date][version_pk] += counted_downloads
+                for date, download_counts in daily_counts.items():
+                    PackageVersionDailyDownloads.add_downloads(date, download_counts)
+
+                PackageVersionDownloadEvent.objects.filter(
+                    pk__in=[event[0] for event in events],
+                ).delete()
+            total += len(events)
 
     class Meta:
         unique_together = ("version", "source_ip")
+
+
+class PackageVersionDailyDownloads(models.Model):
+    version = models.ForeignKey(
+        PackageVersion,
+        related_name="daily_downloads",
+        on_delete=models.CASCADE,
+    )
+    date = models.DateField(
+        db_index=True,
+    )
+    downloads = models.PositiveIntegerField(
+        default=0,
+    )
+
+    class Meta:
+        unique_together = ("version", "date")
+        verbose_name = "Package Version Daily Downloads"
+        verbose_name_plural = "Package Version Daily Downloads"
+
+    @staticmethod
+    def add_downloads(date, download_counts):
+        """
+        Add download counts to the statistics of the given day.
+
+        :param date: The day the downloads happened on
+        :param download_counts: The amount of downloads keyed by
+            PackageVersion primary key
+        """
+        with transaction.atomic():
+            existing = PackageVersionDailyDownloads.objects.filter(
+                version_id__in=download_counts.keys(),
+                date=date,
+            )
+            existing_pks = set(existing.values_list("version_id", flat=True))
+            existing.update(
+                downloads=F("downloads") + get_count_expression(download_counts, "version_id"),
+            )
+            PackageVersionDailyDownloads.objects.bulk_create([
+                PackageVersionDailyDownloads(version_id=pk, date=date, downloads=count)
+                for pk, count in download_counts.items()
+                if pk not in existing_pks
+            ])
+
+    def __str__(self):
+        return f"{self.version} on {self.date}"
+
+
+class PackageVersionDownloadBatch(models.Model):
+    """
+    Records a batch of buffered downloads which has been added to the
+    database, so that a batch which was not released afterwards is not added
+    again, see the flush_download_counters command
+    """
+    batch_id = models.UUIDField(
+        unique=True,
+    )
+    date_flushed = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+    )
+
+    def __str__(self):
+        return str(self.batch_id)
+
+
+# Tombstones are kept this long, so change feed cursors and other copies of
+# the catalog older than this must be rebuilt from the full list
+PACKAGE_TOMBSTONE_RETENTION = timedelta(days=30)
+
+
+class PackageTombstone(models.Model):
+    """
+    Marks a deleted package for the change feed of the v1 API
+    """
+    uuid4 = models.UUIDField()
+    date_deleted = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+    )
+
+    def __str__(self):
+        return str(self.uuid4)
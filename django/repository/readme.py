@@ -0,0 +1,97 @@
+import os
+import sys
+import subprocess
+
+import markdown
+
+from django.utils.html import escape
+
+
+# Bump whenever the rendered output changes, e.g. when extensions are added,
+# and run the render_readmes command to re-render the stored readmes
+README_RENDERER_VERSION = 1
+README_EXTENSIONS = [
+    "markdown.extensions.abbr",
+    "markdown.extensions.def_list",
+    "markdown.extensions.fenced_code",
+    "markdown.extensions.footnotes",
+    "markdown.extensions.tables",
+    "markdown.extensions.admonition",
+    # "markdown.extensions.codehilite",  # TODO: Configure
+    "markdown.extensions.nl2br",
+    "markdown.extensions.sane_lists",
+    "markdown.extensions.toc",
+    "markdown.extensions.wikilinks",
+
+    "pymdownx.magiclink",
+    "pymdownx.tilde",
+]
+# Seconds a single readme may take to render
+README_RENDER_TIMEOUT = 10
+
+
+class ReadmeRenderError(Exception):
+    pass
+
+
+def deduplicate_escape(text):
+    return (
+        text
+        .replace("&amp;lt;", "&lt;")
+        .replace("&amp;gt;", "&gt;")
+        .replace("&amp;quot;", "&quot;")
+        .replace("&amp;#39;", "&#39;")
+        .replace("&amp;amp;", "&amp;")
+    )
+
+
+def render_readme(readme):
+    """
+    Render readme markdown to HTML. Any HTML in the readme is escaped.
+
+    :param readme: The readme markdown
+    :return: The rendered HTML
+    :rtype: str
+    """
+    return deduplicate_escape(markdown.markdown(
+        escape(readme),
+        extensions=README_EXTENSIONS,
+    ))
+
+
+def render_readme_fallback(readme):
+    return f"<pre>{escape(readme)}</pre>"
+
+
+def render_readme_isolated(readme, timeout=README_RENDER_TIMEOUT):
+    """
+    Render readme markdown to HTML in a separate process, so that rendering
+    pathological input can be stopped and does not block the event loop of
+    the calling worker.
+
+    :param readme: The readme markdown
+    :param timeout: Seconds after which rendering is stopped
+    :return: The rendered HTML
+    :rtype: str
+    :raises ReadmeRenderError: If rendering failed, took longer than the
+        timeout or the rendering process could not be started
+    """
+    if not readme:
+        return ""
+    try:
+        result = subprocess.run(
+            [sys.executable, "-m", "repository.readme"],
+            input=readme.encode("utf-8"),
+            stdout=subprocess.PIPE,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            timeout=timeout,
+            check=True,
+        )
+    except (subprocess.TimeoutExpired, subprocess.CalledProcessError, OSError) as e:
+        # OSError if the renderer process could not be started at all
+        raise ReadmeRenderError() from e
+    return result.stdout.decode("utf-8")
+
+
+if __name__ == "__main__":
+    sys.stdout.write(render_readme(sys.stdin.buffer.read().decode("utf-8")))
@@ -0,0 +1,16 @@
+from django import template
+
+from repository.thumbnails import get_icon_url
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def icon_url(context, icon, alias, shared=True):
+    # Thumbnails are generated on upload, never while rendering. Icons outside
+    # of cached fragments aren't shared, so that a cached render doesn't
+    # evaluate everything the page resolver covers.
+    thumbnail_resolver = context.get("thumbnail_resolver") if shared else None
+    if thumbnail_resolver is None:
+        return get_icon_url(icon, alias)
+    return thumbnail_resolver.get_url(icon, alias)
@@ -0,0 +1,316 @@
+import gzip
+import json
+
+from datetime import timedelta
+
+import brotli
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from repository.api.v1.changes import decode_cursor, get_package_changes
+from repository.api.v1.serializers import PackageSerializer
+from repository.api.v1.snapshot import iter_package_list_chunks, iter_package_list_json
+from repository.cache import get_mod_list_queryset
+from repository.dependency_graph import MAX_DEPENDENCY_DEPTH, dependency_graph
+from repository.models import Package, PackageVersion
+
+from ..factories import PackageFactory, PackageVersionFactory, UploaderIdentityFactory
+
+
+@pytest.fixture(autouse=True)
+def snapshot_root(settings, tmpdir):
+    settings.SNAPSHOT_ROOT = str(tmpdir)
+
+
+@pytest.fixture(autouse=True)
+def clear_dependency_graph():
+    dependency_graph.clear()
+
+
+@pytest.mark.django_db
+def test_package_list_api(client, active_package):
+    response = client.get(reverse("api-v1:package-list"))
+    assert response.status_code == 200
+    data = json.loads(b"".join(response.streaming_content))
+    assert data[0]["name"] == active_package.name
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("encoding, decompress", [
+    ("br", brotli.decompress),
+    ("gzip", gzip.decompress),
+])
+def test_package_list_api_compressed(client, active_package, encoding, decompress):
+    response = client.get(
+        reverse("api-v1:package-list"),
+        HTTP_ACCEPT_ENCODING=f"{encoding}, identity",
+    )
+    assert response.status_code == 200
+    assert response["Content-Encoding"] == encoding
+    data = json.loads(decompress(response.content))
+    assert data[0]["name"] == active_package.name
+
+
+@pytest.mark.django_db
+def test_package_list_api_not_modified(client, active_package, locmem_cache):
+    url = reverse("api-v1:package-list")
+    etag = client.get(url)["ETag"]
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    active_package.is_deprecated = True
+    active_package.save()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_package_list_api_etag_varies_on_encoding(client, active_package, locmem_cache):
+    url = reverse("api-v1:package-list")
+    identity_etag = client.get(url)["ETag"]
+    gzip_etag = client.get(url, HTTP_ACCEPT_ENCODING="gzip")["ETag"]
+    assert identity_etag != gzip_etag
+
+    response = client.get(url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=identity_etag)
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_package_detail_api_not_modified_after_removal(client, active_package, locmem_cache):
+    url = reverse("api-v1:package-detail", kwargs={"uuid4": active_package.uuid4})
+    etag = client.get(url)["ETag"]
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    # Bypass the signals, so that the catalog watermark is left as is
+    type(active_package).objects.filter(pk=active_package.pk).update(is_active=False)
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code != 304
+
+
+def create_catalog(owner, start, size):
+    for i in range(start, start + size):
+        dependency = PackageFactory.create(owner=owner, name=f"Dependency_{i}")
+        PackageVersionFactory.create(package=dependency, is_active=True)
+        package = PackageFactory.create(owner=owner, name=f"Package_{i}")
+        for version_number in ("1.0.0", "1.10.0", "1.2.0"):
+            version = PackageVersionFactory.create(
+                package=package,
+                version_number=version_number,
+                is_active=True,
+            )
+            version.dependencies.add(dependency.versions.get())
+
+
+def count_serializer_queries():
+    with CaptureQueriesContext(connection) as context:
+        data = PackageSerializer(get_mod_list_queryset(), many=True).data
+    return len(context.captured_queries), data
+
+
+@pytest.mark.django_db
+def test_package_serializer_query_count():
+    owner = UploaderIdentityFactory.create()
+    create_catalog(owner, 0, 1)
+    small_count, data = count_serializer_queries()
+    versions = data[0]["versions"]
+    assert [version["version_number"] for version in versions] == ["1.10.0", "1.2.0", "1.0.0"]
+    assert versions[0]["dependencies"] == [f"{owner.name}-Dependency_0-1.0.0"]
+
+    create_catalog(owner, 1, 5)
+    large_count, data = count_serializer_queries()
+    assert len(data) == 12
+    assert large_count == small_count
+
+
+@pytest.mark.django_db
+def test_package_list_chunks():
+    owner = UploaderIdentityFactory.create()
+    create_catalog(owner, 0, 2)
+    chunks = list(iter_package_list_chunks(chunk_size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 1]
+    packages = [package for chunk in chunks for package in chunk]
+    assert packages == list(get_mod_list_queryset())
+
+
+@pytest.mark.django_db
+def test_package_list_chunks_stream_primary_keys(locmem_cache):
+    owner = UploaderIdentityFactory.create()
+    create_catalog(owner, 0, 2)
+    with CaptureQueriesContext(connection) as context:
+        next(iter_package_list_chunks(chunk_size=3))
+    first_query = context.captured_queries[0]["sql"]
+    assert first_query.startswith('SELECT "repository_package"."id" FROM "repository_package"')
+
+
+@pytest.mark.django_db
+def test_package_list_json_empty(rf):
+    assert json.loads(b"".join(iter_package_list_json(rf.get("/")))) == []
+
+
+@pytest.mark.django_db
+def test_package_list_api_paginated(client):
+    owner = UploaderIdentityFactory.create()
+    create_catalog(owner, 0, 4)
+    url = reverse("api-v1:package-list")
+    pages = []
+    next_url = f"{url}?page_size=3"
+    while next_url:
+        response = client.get(next_url)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == 8
+        pages.append([package["uuid4"] for package in data["results"]])
+        next_url = data["next"]
+    assert [len(page) for page in pages] == [3, 3, 2]
+    assert sum(pages, []) == [str(package.uuid4) for package in get_mod_list_queryset()]
+
+    response = client.get(data["previous"])
+    assert [package["uuid4"] for package in response.json()["results"]] == pages[1]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("params", [
+    {"cursor": "not-a-cursor"},
+    {"cursor": "e30="},
+    {"cursor": "W10="},
+    {"page_size": "0"},
+    {"page_size": "many"},
+])
+def test_package_list_api_paginated_invalid(client, params):
+    response = client.get(reverse("api-v1:package-list"), params)
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_package_detail_api(client, active_package):
+    response = client.get(reverse("api-v1:package-detail", kwargs={"uuid4": active_package.uuid4}))
+    assert response.status_code == 200
+    assert response.json()["name"] == active_package.name
+
+
+@pytest.mark.django_db
+def test_package_changes_api(client, active_package):
+    url = reverse("api-v1:package-changes")
+    response = client.get(url, {"since": (timezone.now() - timedelta(days=1)).isoformat()})
+    assert response.status_code == 200
+    data = response.json()
+    assert [package["name"] for package in data["packages"]] == [active_package.name]
+    assert data["removed"] == []
+    assert not data["has_more"]
+
+    uuid4 = str(active_package.uuid4)
+    active_package.delete()
+    response = client.get(url, {"since": data["cursor"]})
+    assert response.status_code == 200
+    assert response.json()["packages"] == []
+    assert response.json()["removed"] == [uuid4]
+
+
+@pytest.mark.django_db
+def test_package_changes_pages():
+    owner = UploaderIdentityFactory.create(name="Tester")
+    for i in range(5):
+        package = PackageFactory.create(owner=owner, name=f"Package_{i}")
+        PackageVersionFactory.create(package=package, is_active=True)
+    Package.objects.filter(name="Package_3").update(is_active=False)
+
+    cursor = decode_cursor((timezone.now() - timedelta(hours=1)).isoformat())
+    names = []
+    removed = []
+    has_more = True
+    while has_more:
+        next_cursor, has_more, packages, page_removed = get_package_changes(cursor, page_size=2)
+        assert len(packages) + len(page_removed) <= 2
+        names += [package.name for package in packages]
+        removed += page_removed
+        cursor = decode_cursor(next_cursor)
+    assert names == ["Package_0", "Package_1", "Package_2", "Package_4"]
+    assert removed == [Package.objects.get(name="Package_3").uuid4]
+    assert cursor.after is None
+
+
+@pytest.mark.django_db
+def test_package_changes_api_expired(client):
+    response = client.get(reverse("api-v1:package-changes"), {"since": "2000-01-01T00:00:00Z"})
+    assert response.status_code == 410
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("since", [None, "", "not-a-cursor"])
+def test_package_changes_api_invalid_since(client, since):
+    params = {"since": since} if since is not None else {}
+    response = client.get(reverse("api-v1:package-changes"), params)
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_package_resolve_api(client, active_version):
+    dependant = PackageVersionFactory.create(is_active=True)
+    dependant.dependencies.add(active_version)
+    cyclic = PackageVersionFactory.create(is_active=True)
+    cyclic.dependencies.add(dependant)
+    active_version.dependencies.add(cyclic)
+
+    response = client.get(reverse("api-v1:package-resolve"), {
+        "packages": f"{dependant.full_version_name},Missing-Package-1.0.0",
+    })
+    assert response.status_code == 200
+    data = response.json()
+    assert [version["full_name"] for version in data["versions"]] == [
+        cyclic.full_version_name,
+        active_version.full_version_name,
+        dependant.full_version_name,
+    ]
+    assert data["versions"][0]["download_url"].endswith(cyclic.download_url)
+    assert data["missing"] == ["Missing-Package-1.0.0"]
+    assert data["cycles"] == [[
+        dependant.full_version_name,
+        active_version.full_version_name,
+        cyclic.full_version_name,
+        dependant.full_version_name,
+    ]]
+
+    published = PackageVersionFactory.create(is_active=True)
+    published.dependencies.add(dependant)
+    response = client.get(reverse("api-v1:package-resolve"), {"packages": published.full_version_name})
+    assert len(response.json()["versions"]) == 4
+
+
+@pytest.mark.django_db
+def test_package_resolve_api_refresh(client, active_version):
+    url = reverse("api-v1:package-resolve")
+    full_version_name = active_version.full_version_name
+    assert client.get(url, {"packages": full_version_name}).json()["missing"] == []
+
+    owner = active_version.package.owner
+    owner.name = "Renamed_Owner"
+    owner.save()
+    renamed = PackageVersion.objects.get(pk=active_version.pk).full_version_name
+    data = client.get(url, {"packages": f"{full_version_name},{renamed}"}).json()
+    assert data["missing"] == [full_version_name]
+
+    active_version.is_active = False
+    active_version.save()
+    assert client.get(url, {"packages": renamed}).json()["missing"] == [renamed]
+
+
+@pytest.mark.django_db
+def test_package_resolve_api_depth_limit(client):
+    owner = UploaderIdentityFactory.create()
+    versions = []
+    for i in range(MAX_DEPENDENCY_DEPTH + 1):
+        package = PackageFactory.create(owner=owner, name=f"Package_{i}")
+        version = PackageVersionFactory.create(package=package, is_active=True)
+        version.dependencies.add(*versions[-1:])
+        versions.append(version)
+
+    url = reverse("api-v1:package-resolve")
+    response = client.get(url, {"packages": versions[-2].full_version_name})
+    assert response.status_code == 200
+    assert len(response.json()["versions"]) == MAX_DEPENDENCY_DEPTH
+    response = client.get(url, {"packages": versions[-1].full_version_name})
+    assert response.status_code == 400
@@ -0,0 +1,294 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from core.cache import CacheBustCondition, get_cache_generation, scope_cache_bust_condition
+
+from ..factories import PackageVersionDownloadEventFactory, PackageVersionFactory
+from ..models import (
+    Package,
+    PackageListing,
+    PackageTombstone,
+    PackageVersion,
+    PackageVersionDownloadEvent,
+    PackageVersionReadme,
+    ReadmeEncoding,
+    render_html,
+)
+from .. import readme
+from ..readme import README_RENDERER_VERSION, ReadmeRenderError, render_readme_isolated
+
+
+@pytest.mark.django_db
+def test_package_cache_bust_conditions(active_version):
+    dependant = PackageVersionFactory.create()
+    dependant.dependencies.add(active_version)
+    conditions = dependant.package.get_cache_bust_conditions()
+    assert f"package_updated:{dependant.package.pk}" in conditions
+    assert f"owner_packages_updated:{dependant.package.owner.pk}" in conditions
+    assert f"package_dependants_updated:{active_version.package.pk}" in conditions
+    assert f"package_updated:{active_version.package.pk}" in conditions
+
+
+@pytest.mark.django_db
+def test_package_total_downloads(active_version):
+    other_version = PackageVersionFactory.create(
+        package=active_version.package,
+        version_number="1.1.0",
+    )
+    active_version.increase_download_counter()
+    active_version.increase_download_counter()
+    other_version.increase_download_counter()
+    package = Package.objects.get(pk=active_version.package.pk)
+    assert package.total_downloads == 3
+
+    other_version.delete()
+    package.refresh_from_db()
+    assert package.total_downloads == 2
+
+
+@pytest.mark.django_db
+def test_package_save_keeps_derived_fields(active_version):
+    package = Package.objects.get(pk=active_version.package_id)
+    active_version.increase_download_counter()
+    package.is_deprecated = True
+    package.save()
+    package.refresh_from_db()
+    assert package.is_deprecated
+    assert package.total_downloads == 1
+    assert package.has_active_versions
+
+
+@pytest.mark.django_db
+def test_package_version_add_downloads(active_version):
+    other_version = PackageVersionFactory.create()
+    PackageVersion.add_downloads({
+        active_version.pk: 3,
+        other_version.pk: 5,
+    }, batch_size=1)
+    active_version.refresh_from_db()
+    assert active_version.downloads == 3
+    assert Package.objects.get(pk=active_version.package_id).total_downloads == 3
+    assert Package.objects.get(pk=other_version.package_id).total_downloads == 5
+
+
+@pytest.mark.django_db
+def test_download_event_rollup(active_version):
+    now = timezone.now()
+    yesterday = now.replace(hour=12) - timedelta(days=1)
+    for i, last_download in enumerate((yesterday, yesterday - timedelta(hours=1), now)):
+        event = PackageVersionDownloadEventFactory.create(
+            version=active_version,
+            source_ip=f"127.0.0.{i}",
+            counted_downloads=2,
+        )
+        PackageVersionDownloadEvent.objects.filter(pk=event.pk).update(last_download=last_download)
+
+    assert PackageVersionDownloadEvent.rollup_expired_events(batch_size=1) == 2
+    assert PackageVersionDownloadEvent.objects.count() == 1
+    daily_downloads = active_version.daily_downloads.get()
+    assert daily_downloads.date == yesterday.date()
+    assert daily_downloads.downloads == 4
+
+
+@pytest.mark.django_db
+def test_package_version_download_event_rolled_up(active_version):
+    event = PackageVersionDownloadEventFactory.create(version=active_version, source_ip="127.0.0.1")
+    assert not event.count_downloads_and_return_validity()
+
+    PackageVersionDownloadEvent.objects.filter(pk=event.pk).delete()
+    assert event.count_downloads_and_return_validity()
+    assert PackageVersionDownloadEvent.objects.filter(version=active_version, source_ip="127.0.0.1").exists()
+
+
+@pytest.mark.django_db
+def test_package_version_ordering(active_version):
+    package = active_version.package
+    for version_number in ("1.10.0", "1.9.0", "0.20.1"):
+        PackageVersionFactory.create(package=package, version_number=version_number, is_active=True)
+    package = Package.objects.get(pk=package.pk)
+    assert package.latest.version_number == "1.10.0"
+    assert [version.version_number for version in package.available_versions] == [
+        "1.10.0", "1.9.0", "1.0.0", "0.20.1",
+    ]
+
+
+@pytest.mark.django_db
+def test_package_has_active_versions(active_version):
+    package = active_version.package
+    assert Package.objects.active().filter(pk=package.pk).exists()
+
+    active_version.is_active = False
+    active_version.save()
+    package.refresh_from_db()
+    assert not package.has_active_versions
+    assert not Package.objects.active().filter(pk=package.pk).exists()
+
+    PackageVersionFactory.create(package=package, version_number="1.1.0", is_active=True)
+    package.refresh_from_db()
+    assert package.is_effectively_active
+
+
+@pytest.mark.django_db
+def test_package_dependants(active_version):
+    target = active_version.package
+    dependant = PackageVersionFactory.create(is_active=True)
+    dependant.dependencies.add(active_version)
+    target.refresh_from_db()
+    assert target.dependant_count == 1
+    assert list(target.dependants) == [dependant.package]
+
+    dependant.is_active = False
+    dependant.save()
+    target.refresh_from_db()
+    assert target.dependant_count == 0
+
+    dependant.is_active = True
+    dependant.save()
+    dependant.dependencies.remove(active_version)
+    target.refresh_from_db()
+    assert target.dependant_count == 0
+    assert list(target.dependants) == []
+
+    dependant.dependencies.add(active_version)
+    dependant.package.delete()
+    target.refresh_from_db()
+    assert target.dependant_count == 0
+
+
+@pytest.mark.django_db
+def test_package_listing(active_version):
+    package = active_version.package
+    listing = PackageListing.objects.get(pk=package.pk)
+    assert listing.is_active
+    assert listing.owner_name == package.owner.name
+    assert listing.version_number == active_version.version_number
+    assert listing.icon.name == active_version.icon.name
+
+    newer = PackageVersionFactory.create(
+        package=package,
+        version_number="2.0.0",
+        description="Newer",
+        is_active=True,
+    )
+    newer.increase_download_counter()
+    PackageVersion.add_downloads({active_version.pk: 2})
+    listing.refresh_from_db()
+    assert (listing.version_number, listing.description) == ("2.0.0", "Newer")
+    assert listing.total_downloads == 3
+
+    newer.is_active = False
+    newer.save()
+    active_version.is_active = False
+    active_version.save()
+    listing.refresh_from_db()
+    assert not listing.is_active
+
+    package.owner.name = "Renamed"
+    package.owner.save()
+    assert PackageListing.objects.get(pk=package.pk).owner_name == "Renamed"
+
+    package.delete()
+    assert not PackageListing.objects.filter(pk=package.pk).exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("readme, encoding", [
+    ("# Short readme", ReadmeEncoding.plain),
+    ("# Long readme\n" * 200, ReadmeEncoding.zlib),
+])
+def test_package_version_readme(readme, encoding):
+    version = PackageVersionFactory.create(readme=readme)
+    assert PackageVersionReadme.objects.get(pk=version.pk).encoding == encoding
+    assert "readme" not in [field.name for field in PackageVersion._meta.get_fields()]
+
+    version = PackageVersion.objects.with_readme().get(pk=version.pk)
+    assert version.readme == readme
+
+    version.readme = "Changed"
+    version.save()
+    assert PackageVersion.objects.get(pk=version.pk).readme == "Changed"
+
+
+@pytest.mark.django_db
+def test_package_version_readme_html():
+    version = PackageVersionFactory.create(readme="# Title\n\n<script>alert(1)</script>")
+    readme = PackageVersionReadme.objects.get(pk=version.pk)
+    assert readme.renderer_version == README_RENDERER_VERSION
+    assert "<h1" in readme.html
+    assert "<script>" not in readme.html
+
+    PackageVersionReadme.objects.filter(pk=version.pk).update(html="", renderer_version=0)
+    readme.refresh_from_db()
+    assert readme.get_html().startswith("<pre>")
+    readme.refresh_from_db()
+    assert readme.renderer_version == 0
+    call_command("render_readmes", processes=1, stdout=StringIO())
+    readme.refresh_from_db()
+    assert readme.renderer_version == README_RENDERER_VERSION
+    assert PackageVersion.objects.with_readme().get(pk=version.pk).readme_html == readme.html
+
+
+def test_render_readme_isolated_timeout():
+    with pytest.raises(ReadmeRenderError):
+        render_readme_isolated("# Title", timeout=0.001)
+
+
+def test_render_readme_isolated_spawn_failure(monkeypatch):
+    def fail_to_spawn(*args, **kwargs):
+        raise BlockingIOError("Resource temporarily unavailable")
+
+    monkeypatch.setattr(readme.subprocess, "run", fail_to_spawn)
+    with pytest.raises(ReadmeRenderError):
+        render_readme_isolated("# Title")
+    assert render_html("# Title") == "<pre># Title</pre>"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_package_delete_with_versions(active_version):
+    package = active_version.package
+    PackageVersionFactory.create(package=package, version_number="2.0.0", is_active=True)
+    package.delete()
+    assert not Package.objects.filter(pk=package.pk).exists()
+    assert not PackageListing.objects.filter(pk=package.pk).exists()
+    assert PackageTombstone.objects.filter(uuid4=package.uuid4).exists()
+
+
+@pytest.mark.django_db
+def test_package_listing_stale_save(active_version):
+    package = Package.objects.get(pk=active_version.package_id)
+    active_version.is_active = False
+    active_version.save()
+    assert not PackageListing.objects.get(pk=package.pk).is_active
+
+    package.is_deprecated = True
+    package.save()
+    assert not PackageListing.objects.get(pk=package.pk).is_active
+
+
+@pytest.mark.django_db
+def test_package_listing_total_downloads(active_version):
+    package = Package.objects.get(pk=active_version.package_id)
+    active_version.increase_download_counter()
+    PackageListing.update_for_package(package)
+    assert PackageListing.objects.get(pk=package.pk).total_downloads == 1
+
+
+
+@pytest.mark.django_db
+def test_package_save_invalidates_catalog_on_listed_changes(active_package, locmem_cache):
+    generation = get_cache_generation(CacheBustCondition.any_package_updated)
+    scoped = scope_cache_bust_condition(CacheBustCondition.package_updated, active_package.pk)
+    scoped_generation = get_cache_generation(scoped)
+
+    Package.objects.get(pk=active_package.pk).save()
+    assert get_cache_generation(CacheBustCondition.any_package_updated) == generation
+    assert get_cache_generation(scoped) != scoped_generation
+
+    active_package.is_deprecated = True
+    active_package.save()
+    assert get_cache_generation(CacheBustCondition.any_package_updated) != generation
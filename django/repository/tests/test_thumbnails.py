@@ -0,0 +1,41 @@
+import pytest
+
+from easy_thumbnails.alias import aliases
+from easy_thumbnails.files import get_thumbnailer
+
+from ..factories import PackageVersionFactory
+from ..thumbnails import ThumbnailResolver, generate_icon_thumbnails, get_icon_url
+
+
+@pytest.mark.django_db
+def test_icon_thumbnails(settings, tmpdir):
+    settings.MEDIA_ROOT = str(tmpdir)
+    version = PackageVersionFactory.create()
+    assert get_icon_url(version.icon, "icon_128") == version.icon.url
+
+    generate_icon_thumbnails(version.icon)
+    for alias in aliases.all(include_global=True):
+        url = get_icon_url(version.icon, alias)
+        assert url != version.icon.url
+        assert url.startswith(version.icon.url)
+
+
+def test_icon_url_without_icon():
+    assert get_icon_url(None, "icon_128") == ""
+
+
+@pytest.mark.django_db
+def test_thumbnail_resolver(settings, tmpdir, django_assert_num_queries):
+    settings.MEDIA_ROOT = str(tmpdir)
+    versions = PackageVersionFactory.create_batch(3)
+    for version in versions[:2]:
+        generate_icon_thumbnails(version.icon)
+    icons = [version.icon for version in versions]
+
+    resolver = ThumbnailResolver(icons, ["icon_64", "icon_256_crop"])
+    with django_assert_num_queries(1):
+        urls = [resolver.get_url(icon, alias) for icon in icons for alias in ("icon_64", "icon_256_crop")]
+    assert urls == [
+        get_thumbnailer(icon).get_existing_thumbnail(aliases.get(alias)).url
+        for icon in icons[:2] for alias in ("icon_64", "icon_256_crop")
+    ] + [icons[2].url, icons[2].url]
@@ -1,12 +1,20 @@
 import pytest
 
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.http import Http404
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from core.factories import UserFactory
+from core.pagination import paginate_keyset
 
 from ..factories import UploaderIdentityFactory
 from ..factories import PackageFactory
 from ..factories import PackageVersionFactory
+from ..autocomplete import autocomplete_index
+from ..models import Package, PackageListing
+from ..views import PACKAGE_LIST_ORDERINGS, PackageListView
 
 
 @pytest.mark.django_db
@@ -33,6 +41,30 @@ def test_package_list_view(client):
         assert f"test-{i}".encode("utf-8") in response.content
 
 
+@pytest.mark.django_db
+def test_package_list_view_search(client):
+    for name, description in (("Alpha", "Adds more items"), ("Beta", "Removes fog")):
+        package = PackageFactory.create(
+            owner=UploaderIdentityFactory.create(name=f"{name}Team"),
+            name=f"{name}_Mod",
+        )
+        PackageVersionFactory.create(
+            package=package,
+            description=description,
+            is_active=True,
+        )
+
+    for search, expected, unexpected in (
+        ("alpha", b"Alpha_Mod", b"Beta_Mod"),
+        ("betateam", b"Beta_Mod", b"Alpha_Mod"),
+        ("fog", b"Beta_Mod", b"Alpha_Mod"),
+    ):
+        response = client.get(reverse("packages.list"), {"q": search})
+        assert response.status_code == 200
+        assert expected in response.content
+        assert unexpected not in response.content
+
+
 @pytest.mark.django_db
 def test_package_detail_view(client, active_package):
     response = client.get(active_package.get_absolute_url())
@@ -63,3 +95,204 @@ def test_package_create_view_logged_in(client):
     response = client.get(reverse("packages.create"))
     assert response.status_code == 200
     assert b"Upload package" in response.content
+
+
+@pytest.mark.django_db
+def test_package_detail_view_not_modified(client, active_package, locmem_cache):
+    etag = client.get(active_package.get_absolute_url())["ETag"]
+    response = client.get(active_package.get_absolute_url(), HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db
+def test_package_detail_view_dependencies_query_count(client, active_version):
+    owner = UploaderIdentityFactory.create(name="Dependency_Owner")
+    for i in range(5):
+        package = PackageFactory.create(owner=owner, name=f"Dependency_{i}")
+        active_version.dependencies.add(PackageVersionFactory.create(package=package, is_active=True))
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(active_version.package.get_absolute_url())
+    assert response.status_code == 200
+    assert response.content.count(b"Dependency_") >= 5
+    dependency_queries = [
+        query for query in context.captured_queries
+        if "repository_packageversion_dependencies" in query["sql"]
+    ]
+    assert len(dependency_queries) == 1
+    thumbnail_queries = [
+        query for query in context.captured_queries
+        if "easy_thumbnails_" in query["sql"]
+    ]
+    # One for the og:image in the head, one for every icon of the fragment
+    assert len(thumbnail_queries) == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("view", ("package", "version"))
+def test_detail_views_fragment_cached_query_count(client, active_version, locmem_cache, view):
+    package = PackageFactory.create(name="Dependency")
+    active_version.dependencies.add(PackageVersionFactory.create(package=package, is_active=True))
+    if view == "package":
+        url = active_version.package.get_absolute_url()
+    else:
+        url = active_version.get_absolute_url()
+
+    client.get(url)
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    assert b"Dependency" in response.content
+    assert not [
+        query for query in context.captured_queries
+        if "repository_packageversion_dependencies" in query["sql"]
+    ]
+    # Only the og:image in the head is resolved
+    thumbnail_queries = [
+        query for query in context.captured_queries
+        if "easy_thumbnails_" in query["sql"]
+    ]
+    assert len(thumbnail_queries) == 1
+
+
+@pytest.mark.django_db
+def test_package_list_views_not_modified_unknown(client, active_package, locmem_cache):
+    owner_url = reverse("packages.list_by_owner", kwargs={"owner": active_package.owner.name})
+    etag = client.get(owner_url)["ETag"]
+    assert client.get(owner_url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    for url in (
+        reverse("packages.list_by_owner", kwargs={"owner": "Unknown"}),
+        reverse("packages.list_by_dependency", kwargs={"owner": "Unknown", "name": "Unknown"}),
+    ):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code != 304
+        assert not response.has_header("ETag")
+
+
+@pytest.mark.django_db
+def test_package_autocomplete_view(client):
+    autocomplete_index.clear()
+    uploader = UploaderIdentityFactory.create(name="Modder")
+    for name, downloads in (("More_Items", 5), ("Modded_Start", 10), ("Fog", 20)):
+        package = PackageFactory.create(owner=uploader, name=name)
+        PackageVersionFactory.create(package=package, is_active=True)
+        Package.objects.filter(pk=package.pk).update(total_downloads=downloads)
+
+    response = client.get(reverse("packages.autocomplete"), {"q": "MO"})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [(result["type"], result["name"]) for result in results] == [
+        ("owner", "Modder"),
+        ("package", "Modded_Start"),
+        ("package", "More_Items"),
+    ]
+    assert results[1]["url"] == reverse("packages.detail", kwargs={"owner": "Modder", "name": "Modded_Start"})
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("ordering", ("last-updated", "newest", "most-downloaded"))
+def test_package_list_view_keyset_pagination(client, ordering):
+    owner = UploaderIdentityFactory.create(name="Tester")
+    for i in range(30):
+        package = PackageFactory.create(
+            owner=owner,
+            name=f"Package_{i}",
+            is_pinned=i % 7 == 0,
+            is_deprecated=i % 5 == 0,
+        )
+        PackageVersionFactory.create(package=package, is_active=True)
+    # Ties are broken by the primary key
+    tied = list(Package.objects.values_list("pk", flat=True)[:10])
+    ties = {"total_downloads": 5, "date_updated": Package.objects.first().date_updated}
+    Package.objects.filter(pk__in=tied).update(**ties)
+    PackageListing.objects.filter(pk__in=tied).update(**ties)
+
+    expected = list(
+        Package.objects.active()
+        .order_by(*PACKAGE_LIST_ORDERINGS[ordering])
+        .values_list("name", flat=True)
+    )
+    pages = []
+    params = {"ordering": ordering}
+    while True:
+        response = client.get(reverse("packages.list"), params)
+        assert response.status_code == 200
+        assert response.context["total_count"] == 30
+        page = response.context["page_obj"]
+        pages.append([package.name for package in page.object_list])
+        if not page.has_next():
+            break
+        params["cursor"] = page.next_cursor
+    assert [len(names) for names in pages] == [24, 6]
+    assert sum(pages, []) == expected
+
+    params["cursor"] = page.previous_cursor
+    response = client.get(reverse("packages.list"), params)
+    page = response.context["page_obj"]
+    assert [package.name for package in page.object_list] == pages[0]
+    assert not page.has_previous()
+    assert page.has_next()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("ordering", ("last-updated", "most-downloaded"))
+def test_paginate_keyset_groups(ordering):
+    owner = UploaderIdentityFactory.create(name="Tester")
+    for i in range(12):
+        package = PackageFactory.create(
+            owner=owner,
+            name=f"Package_{i}",
+            is_pinned=i % 3 == 0,
+            is_deprecated=i % 2 == 0,
+        )
+        PackageVersionFactory.create(package=package, is_active=True)
+    Package.objects.filter(name__in=("Package_1", "Package_2")).update(total_downloads=5)
+    PackageListing.objects.filter(name__in=("Package_1", "Package_2")).update(total_downloads=5)
+
+    ordering = PACKAGE_LIST_ORDERINGS[ordering]
+    queryset = PackageListing.objects.active()
+    expected = list(queryset.order_by(*ordering).values_list("name", flat=True))
+    pages = [paginate_keyset(queryset, ordering, None, 2)]
+    while pages[-1].has_next():
+        pages.append(paginate_keyset(queryset, ordering, pages[-1].next_cursor, 2))
+    assert [listing.name for page in pages for listing in page.object_list] == expected
+
+    previous_pages = [pages[-1]]
+    while previous_pages[-1].has_previous():
+        previous_pages.append(paginate_keyset(queryset, ordering, previous_pages[-1].previous_cursor, 2))
+    assert [
+        [listing.name for listing in page.object_list] for page in reversed(previous_pages)
+    ] == [[listing.name for listing in page.object_list] for page in pages]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("cursor", ("invalid", "e30=", "W10="))
+def test_package_list_view_invalid_cursor(rf, cursor):
+    request = rf.get(reverse("packages.list"), {"cursor": cursor})
+    request.user = AnonymousUser()
+    with pytest.raises(Http404):
+        PackageListView.as_view()(request)
+
+
+@pytest.mark.django_db
+def test_package_list_view_query_count(client):
+    owner = UploaderIdentityFactory.create(name="Tester")
+    for i in range(10):
+        package = PackageFactory.create(owner=owner, name=f"Package_{i}")
+        PackageVersionFactory.create(package=package, is_active=True)
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(reverse("packages.list"))
+    assert response.status_code == 200
+    listing_queries = [
+        query for query in context.captured_queries
+        if "repository_" in query["sql"]
+    ]
+    # The page of listings and the cached total
+    assert len(listing_queries) == 2
+    thumbnail_queries = [
+        query for query in context.captured_queries
+        if "easy_thumbnails_" in query["sql"]
+    ]
+    assert len(thumbnail_queries) == 1
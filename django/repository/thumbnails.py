@@ -0,0 +1,97 @@
+from easy_thumbnails.alias import aliases
+from easy_thumbnails.files import get_thumbnailer
+from easy_thumbnails.models import Thumbnail
+from easy_thumbnails.utils import get_storage_hash
+
+
+def generate_icon_thumbnails(icon):
+    """
+    Generate the thumbnails of every alias in settings.THUMBNAIL_ALIASES
+    for an icon. Thumbnails which already exist are kept.
+
+    :param icon: The icon, either a FieldFile or a name in the default storage
+    """
+    thumbnailer = get_thumbnailer(icon)
+    for options in aliases.all(include_global=True).values():
+        thumbnailer.get_thumbnail(options)
+
+
+def get_icon_url(icon, alias):
+    """
+    Get the URL of an icon thumbnail without generating it, falling back to
+    the full size icon if the thumbnail has not been generated yet.
+
+    :param icon: The icon FieldFile
+    :param alias: The name of the thumbnail alias
+    :return: The URL of the thumbnail or the icon
+    :rtype: str
+    """
+    return ThumbnailResolver([icon], [alias]).get_url(icon, alias)
+
+
+class ThumbnailResolver(object):
+    """
+    Resolves the thumbnail URLs of many icons with a single query, instead
+    of the two queries per icon of Thumbnailer.get_existing_thumbnail.
+
+    Nothing is queried until the first URL is requested, so pages served
+    from the template fragment cache don't pay for it. Icons not given up
+    front are resolved individually.
+
+    :param icons: The icon FieldFiles, iterated on first use
+    :param alias_names: The thumbnail aliases which to resolve
+    """
+
+    def __init__(self, icons, alias_names):
+        self.icons = icons
+        self.alias_names = alias_names
+        self.urls = None
+
+    def resolve(self, icons, alias_names):
+        candidates = {}
+        for icon in icons:
+            if not icon:
+                continue
+            thumbnailer = get_thumbnailer(icon)
+            storage_hash = get_storage_hash(thumbnailer.thumbnail_storage)
+            for alias in alias_names:
+                options = aliases.get(alias)
+                # The extension depends on whether the icon is transparent
+                for transparent in (False, True):
+                    name = thumbnailer.get_thumbnail_name(options, transparent=transparent)
+                    candidates[(storage_hash, name)] = (icon.name, alias, thumbnailer.thumbnail_storage)
+
+        urls = {}
+        if candidates:
+            existing = Thumbnail.objects.filter(
+                storage_hash__in={storage_hash for storage_hash, name in candidates},
+                name__in={name for storage_hash, name in candidates},
+            )
+            for key in existing.values_list("storage_hash", "name"):
+                if key in candidates:
+                    icon_name, alias, storage = candidates[key]
+                    urls[(icon_name, alias)] = storage.url(key[1])
+        for icon in icons:
+            if not icon:
+                continue
+            for alias in alias_names:
+                urls.setdefault((icon.name, alias), icon.url)
+        return urls
+
+    def get_url(self, icon, alias):
+        """
+        Get the URL of an icon thumbnail, falling back to the full size
+        icon if the thumbnail has not been generated yet.
+
+        :param icon: The icon FieldFile
+        :param alias: The name of the thumbnail alias
+        :return: The URL of the thumbnail or the icon
+        :rtype: str
+        """
+        if not icon:
+            return ""
+        if self.urls is None:
+            self.urls = self.resolve(list(self.icons), self.alias_names)
+        if (icon.name, alias) not in self.urls:
+            self.urls.update(self.resolve([icon], [alias]))
+        return self.urls[(icon.name, alias)]
@@ -1,6 +1,7 @@
 from django.urls import path
 
 from repository.views import PackageListView
+from repository.views import PackageAutocompleteView
 from repository.views import PackageDetailView
 from repository.views import PackageCreateView
 from repository.views import PackageDownloadView
@@ -20,6 +21,11 @@ urlpatterns = [
         PackageCreateView.as_view(),
         name="packages.create"
     ),
+    path(
+        'autocomplete/',
+        PackageAutocompleteView.as_view(),
+        name="packages.autocomplete"
+    ),
     path(
         'download/<str:owner>/<str:name>/<str:version>/',
         PackageDownloadView.as_view(),
@@ -1,16 +1,28 @@
-from django.contrib.postgres.search import TrigramSimilarity, SearchVector, SearchQuery
-from django.db import transaction
-from django.db.models import Q, Sum
-from django.http import Http404
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.http import Http404, JsonResponse
 from django.urls import reverse_lazy
 from django.views.generic.list import ListView
 from django.views.generic.detail import DetailView
 from django.views.generic.edit import CreateView
 from django.views.generic import View
 
+from core.cache import (
+    CacheBustCondition,
+    WatermarkConditionalMixin,
+    scope_cache_bust_condition,
+)
+from core.pagination import InvalidCursor, get_cached_count, paginate_keyset
+
+from repository.autocomplete import autocomplete_index
+from repository.cache import get_package_version_tag
+from repository.models import SEARCH_CONFIG
 from repository.models import Package
+from repository.models import PackageListing
 from repository.models import PackageVersion
 from repository.models import UploaderIdentity
+from repository.thumbnails import ThumbnailResolver
 from repository.ziptools import PackageVersionForm
 
 from django.shortcuts import redirect, get_object_or_404
@@ -18,9 +30,26 @@ from django.shortcuts import redirect, get_object_or_404
 # Should be divisible by 4 and 3
 MODS_PER_PAGE = 24
 
+# Every ordering ends with the primary key so that it can be used as a
+# pagination keyset
+PACKAGE_LIST_ORDERINGS = {
+    "last-updated": ("-is_pinned", "is_deprecated", "-date_updated", "-pk"),
+    "newest": ("-is_pinned", "is_deprecated", "-date_created", "-pk"),
+    "most-downloaded": ("-is_pinned", "is_deprecated", "-total_downloads", "-pk"),
+}
 
-class PackageListSearchView(ListView):
-    model = Package
+
+class CatalogConditionalMixin(WatermarkConditionalMixin):
+    watermark_conditions = (
+        CacheBustCondition.any_package_updated,
+        CacheBustCondition.dynamic_html_updated,
+    )
+    watermark_vary_on_user = True
+
+
+class PackageListSearchView(CatalogConditionalMixin, ListView):
+    model = PackageListing
+    template_name = "repository/package_list.html"
     paginate_by = MODS_PER_PAGE
 
     def get_base_queryset(self):
@@ -32,6 +61,9 @@ class PackageListSearchView(ListView):
     def get_cache_vary(self):
         return ""
 
+    def get_cache_bust_condition(self):
+        return CacheBustCondition.any_package_updated
+
     def get_full_cache_vary(self):
         cache_vary = self.get_cache_vary()
         cache_vary += f".{self.get_search_query()}"
@@ -55,51 +87,67 @@ class PackageListSearchView(ListView):
     def get_search_query(self):
         return self.request.GET.get("q", "")
 
+    def get_ordering_fields(self):
+        return PACKAGE_LIST_ORDERINGS[self.get_active_ordering()]
+
     def order_queryset(self, queryset):
-        active_ordering = self.get_active_ordering()
-        if active_ordering == "newest":
-            return queryset.order_by("-is_pinned", "is_deprecated", "-date_created")
-        if active_ordering == "most-downloaded":
-            return (
-                queryset
-                .annotate(total_downloads=Sum("versions__downloads"))
-                .order_by("-is_pinned", "is_deprecated", "-total_downloads")
-            )
-        return queryset.order_by("-is_pinned", "is_deprecated", "-date_updated")
+        return queryset.order_by(*self.get_ordering_fields())
 
-    def perform_search(self, queryset, search_query):
-        search_fields = ("name", "owner__name", "latest__description")
+    def is_ranked_search(self):
+        return bool(self.get_search_query()) and connection.vendor == "postgresql"
 
+    def perform_search(self, queryset, search_query):
         icontains_query = Q()
-        parts = search_query.split(" ")
-        for part in parts:
-            for field in search_fields:
-                icontains_query &= ~Q(**{
-                    f"{field}__icontains": part
-                })
-
+        for part in search_query.split(" "):
+            icontains_query |= Q(search_text__icontains=part)
+        return queryset.filter(icontains_query)
+
+    def perform_full_text_search(self, queryset, search_query):
+        # Matches either the search document or, to tolerate typos, names
+        # similar to the query. Both are backed by GIN indexes.
+        query = SearchQuery(search_query, config=SEARCH_CONFIG)
         return (
             queryset
-            # .annotate(name_search_score=TrigramSimilarity("name", search_query))
-            # .annotate(search=SearchVector(*search_fields))
-            # .exclude(
-            #     Q(name_search_score__lte=1) &
-            #     ~Q(search=SearchQuery(search_query))
-            # )
-            .exclude(icontains_query)
-            .distinct()
+            .annotate(search_rank=(
+                SearchRank(F("search_vector"), query) +
+                TrigramSimilarity("name", search_query)
+            ))
+            .filter(Q(search_vector=query) | Q(name__trigram_similar=search_query))
+            .order_by("-search_rank", "-total_downloads")
         )
 
     def get_queryset(self):
-        queryset = (
-            self.get_base_queryset()
-            .prefetch_related("versions")
-        )
+        queryset = self.get_base_queryset()
         search_query = self.get_search_query()
+        if self.is_ranked_search():
+            return self.perform_full_text_search(queryset, search_query)
         if search_query:
             queryset = self.perform_search(queryset, search_query)
         return self.order_queryset(queryset)
 
+    def paginate_queryset(self, queryset, page_size):
+        if self.is_ranked_search():
+            # Search ranks are computed per query and can't be used as keys
+            return super().paginate_queryset(queryset, page_size)
+        try:
+            page = paginate_keyset(
+                queryset=queryset,
+                ordering=self.get_ordering_fields(),
+                cursor=self.request.GET.get("cursor"),
+                page_size=page_size,
+            )
+        except InvalidCursor:
+            raise Http404("Invalid cursor")
+        return (None, page, page.object_list, page.has_other_pages())
+
+    def get_total_count(self):
+        return get_cached_count(
+            queryset=self.object_list,
+            cache_bust_condition=self.get_cache_bust_condition(),
+            key="mod-list",
+            vary_on=[self.get_full_cache_vary()],
+        )
+
     def get_breadcrumbs(self):
         return [{
             "url": reverse_lazy("packages.list"),
@@ -109,10 +157,21 @@ class PackageListSearchView(ListView):
     def get_context_data(self, *args, **kwargs):
         context = super().get_context_data(*args, **kwargs)
         context["cache_vary"] = self.get_full_cache_vary()
+        context["cache_bust_condition"] = self.get_cache_bust_condition()
         context["page_title"] = self.get_page_title()
         context["ordering_modes"] = self.get_ordering_choices()
         context["active_ordering"] = self.get_active_ordering()
         context["current_search"] = self.get_search_query()
+        context["page_cache_key"] = self.request.GET.get("cursor", "")
+        if context["paginator"] is not None:
+            context["page_cache_key"] = context["page_obj"].number
+            context["total_count"] = context["paginator"].count
+        else:
+            context["total_count"] = self.get_total_count()
+        context["thumbnail_resolver"] = ThumbnailResolver(
+            icons=(listing.icon for listing in context["object_list"]),
+            alias_names=["icon_256_crop"],
+        )
         breadcrumbs = self.get_breadcrumbs()
         if len(breadcrumbs) > 1:
             context["breadcrumbs"] = breadcrumbs
@@ -130,6 +189,12 @@ class PackageListView(PackageListSearchView):
 
 class PackageListByOwnerView(PackageListSearchView):
 
+    @classmethod
+    def get_watermark_object_version(cls, request, *args, **kwargs):
+        if not UploaderIdentity.objects.filter(name=kwargs["owner"]).exists():
+            return None
+        return ""
+
     def get_breadcrumbs(self):
         breadcrumbs = super().get_breadcrumbs()
         return breadcrumbs + [{
@@ -148,7 +213,7 @@ class PackageListByOwnerView(PackageListSearchView):
         return super().dispatch(*args, **kwargs)
 
     def get_base_queryset(self):
-        return self.model.objects.active().exclude(~Q(owner=self.owner))
+        return self.model.objects.active().filter(owner=self.owner)
 
     def get_page_title(self):
         return f"Mods uploaded by {self.owner.name}"
@@ -156,17 +221,27 @@ class PackageListByOwnerView(PackageListSearchView):
     def get_cache_vary(self):
         return f"authorer-{self.owner.name}"
 
+    def get_cache_bust_condition(self):
+        return scope_cache_bust_condition(
+            CacheBustCondition.owner_packages_updated,
+            self.owner.pk,
+        )
+
 
 class PackageListByDependencyView(PackageListSearchView):
-    model = Package
-    paginate_by = MODS_PER_PAGE
+
+    @classmethod
+    def get_watermark_object_version(cls, request, *args, **kwargs):
+        return get_package_version_tag(
+            Package.objects.active().filter(owner__name=kwargs["owner"], name=kwargs["name"]),
+        )
 
     def cache_package(self):
         owner = self.kwargs["owner"]
         owner = get_object_or_404(UploaderIdentity, name=owner)
         name = self.kwargs["name"]
         package = (
-            self.model.objects.active()
+            Package.objects.active()
             .filter(owner=owner, name=name)
             .first()
         )
@@ -179,7 +254,7 @@ class PackageListByDependencyView(PackageListSearchView):
         return super().dispatch(*args, **kwargs)
 
     def get_base_queryset(self):
-        return self.package.dependants
+        return self.model.objects.active().filter(package__package_dependencies=self.package)
 
     def get_page_title(self):
         return f"Mods that depend on {self.package.display_name}"
@@ -187,16 +262,48 @@ class PackageListByDependencyView(PackageListSearchView):
     def get_cache_vary(self):
         return f"dependencies-{self.package.id}"
 
+    def get_cache_bust_condition(self):
+        return scope_cache_bust_condition(
+            CacheBustCondition.package_dependants_updated,
+            self.package.pk,
+        )
+
+
+def iter_detail_icons(icon, dependencies):
+    # A generator function rather than expression, since the latter would
+    # evaluate the queryset as soon as it's created
+    yield icon
+    for dependency in dependencies:
+        yield dependency.icon
 
-class PackageDetailView(DetailView):
+
+def get_detail_thumbnail_resolver(icon, dependencies):
+    # The dependencies queryset is shared with the template, so both the
+    # icons and the dependency list are fetched once and only if the page
+    # is not served from the fragment cache. Icons outside of the cached
+    # fragment must not use this resolver.
+    return ThumbnailResolver(
+        icons=iter_detail_icons(icon, dependencies),
+        alias_names=["icon_64", "icon_128", "icon_256"],
+    )
+
+
+class PackageDetailView(CatalogConditionalMixin, DetailView):
     model = Package
 
+    @classmethod
+    def get_watermark_object_version(cls, request, *args, **kwargs):
+        return get_package_version_tag(
+            Package.objects.active().filter(owner__name=kwargs["owner"], name=kwargs["name"]),
+        )
+
     def get_object(self, *args, **kwargs):
         owner = self.kwargs["owner"]
         owner = get_object_or_404(UploaderIdentity, name=owner)
         name = self.kwargs["name"]
         package = (
-            self.model.objects.active()
+            Package.objects.active()
+            .select_related("latest__readme_content")
             .filter(owner=owner, name=name)
             .first()
         )
@@ -209,7 +316,7 @@ class PackageDetailView(DetailView):
 
         dependants_string = ""
         package = context["object"]
-        dependant_count = package.dependants.active().count()
+        dependant_count = package.dependant_count
 
         if dependant_count == 1:
             dependants_string = f"{dependant_count} other mod depends on this mod"
@@ -217,6 +324,8 @@ class PackageDetailView(DetailView):
             dependants_string = f"{dependant_count} other mods depend on this mod"
 
         context["dependants_string"] = dependants_string
+        context["dependencies"] = package.latest.dependencies.select_related("package__owner")
+        context["thumbnail_resolver"] = get_detail_thumbnail_resolver(package.icon, context["dependencies"])
         return context
 
 
@@ -228,9 +337,22 @@ class PackageVersionDetailView(DetailView):
         name = self.kwargs["name"]
         version = self.kwargs["version"]
         package = get_object_or_404(Package, owner__name=owner, name=name)
-        version = get_object_or_404(PackageVersion, package=package, version_number=version)
+        version = get_object_or_404(
+            PackageVersion.objects.with_readme(),
+            package=package,
+            version_number=version,
+        )
         return version
 
+    def get_context_data(self, *args, **kwargs):
+        context = super().get_context_data(*args, **kwargs)
+        context["dependencies"] = context["object"].dependencies.select_related("package__owner")
+        context["thumbnail_resolver"] = get_detail_thumbnail_resolver(
+            context["object"].icon,
+            context["dependencies"],
+        )
+        return context
+
 
 class PackageCreateView(CreateView):
     model = PackageVersion
@@ -266,3 +388,11 @@ class PackageDownloadView(View):
         version = get_object_or_404(PackageVersion, package=package, version_number=version)
         version.maybe_increase_download_counter(self.request)
         return redirect(self.request.build_absolute_uri(version.file.url))
+
+
+class PackageAutocompleteView(View):
+
+    def get(self, *args, **kwargs):
+        autocomplete_index.refresh()
+        results = autocomplete_index.lookup(self.request.GET.get("q", "").strip())
+        return JsonResponse({"results": results})
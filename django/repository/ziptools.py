@@ -9,6 +9,7 @@ from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
 
 from repository.models import PackageVersion, Package
+from repository.thumbnails import generate_icon_thumbnails
 
 MAX_PACKAGE_SIZE = 1024 * 1024 * 500
 MAX_ICON_SIZE = 1024 * 1024 * 6
@@ -207,6 +208,6 @@ class PackageVersionForm(forms.ModelForm):
         )[0]
         self.instance.icon.save("icon.png", self.icon)
         instance = super(PackageVersionForm, self).save()
-        for dependency in self.dependencies:
-            instance.dependencies.add(dependency)
+        instance.dependencies.add(*self.dependencies)
+        generate_icon_thumbnails(instance.icon)
         return instance